@@ -2,7 +2,11 @@ from flask import Flask
 from api import routes
 from api.utils.filters import register_filters
 from api.utils.analytics import analytics_db
-from api.utils.documents import get_all_documents
+from api.utils.documents import document_index
+from api.utils.markdown import warmup_markdown_pools, preload_rendered_documents
+from api.utils.syntax_highlight import get_syntax_highlight_mode
+from api.utils.profiling import register_profiling
+from api.config import DOCS_INDEX_WATCH
 import os
 import threading
 import time
@@ -15,6 +19,8 @@ def create_app():
     app = Flask(__name__)
 
     register_filters(app)
+    register_profiling(app)
+    app.jinja_env.globals['syntax_highlight_mode'] = get_syntax_highlight_mode()
 
     routes.register_blueprints(app)
 
@@ -27,12 +33,20 @@ def create_app():
 
                 time.sleep(0.5)
 
-                get_all_documents.cache_clear()
-                docs = get_all_documents()
+                docs = document_index.refresh()
                 logger.info(f"Successfully loaded {len(docs)} documents")
 
                 doc_names = [doc['filename'] for doc in docs[:5]]
                 logger.info(f"Sample documents: {doc_names}")
+
+                if DOCS_INDEX_WATCH:
+                    document_index.watch()
+
+                warmup_markdown_pools()
+
+                preloaded = preload_rendered_documents()
+                if preloaded:
+                    logger.info(f"Loaded {preloaded} prerendered documents")
                 break
 
             except Exception as e:
@@ -42,7 +56,7 @@ def create_app():
                 else:
                     logger.error("Failed to initialize after all retries")
 
-    init_thread = threading.Thread(target=init_with_retry)
+    init_thread = threading.Thread(target=init_with_retry, name='mdoc-init')
     init_thread.daemon = True
     init_thread.start()
 
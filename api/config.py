@@ -4,11 +4,42 @@ from dotenv import load_dotenv
 load_dotenv()
 
 GITHUB_REPO = "EPI-Studios/Moud-Documentation"
-DOCS_DIR = os.path.join(os.path.dirname(__file__), 'templates', 'docs')
+DOCS_DIR = os.getenv("DOCS_DIR", os.path.join(os.path.dirname(__file__), 'templates', 'docs'))
+DOCS_INDEX_CHECK_SECONDS = float(os.getenv("DOCS_INDEX_CHECK_SECONDS", "2"))
+DOCS_INDEX_WATCH = os.getenv("DOCS_INDEX_WATCH", "0").strip().lower() in {"1", "true", "yes", "on"}
+DOCS_MANIFEST_PATH = os.getenv("DOCS_MANIFEST_PATH", os.path.join(os.path.dirname(__file__), 'data', 'docs_manifest.json')).strip()
 
 GITHUB_API_ENABLED = os.getenv("ENABLE_GITHUB_API", "0").strip().lower() in {"1", "true", "yes", "on"}
 GITHUB_API_TIMEOUT_SECONDS = float(os.getenv("GITHUB_API_TIMEOUT_SECONDS", "0.75"))
 RECENTLY_UPDATED_DAYS = int(os.getenv("RECENTLY_UPDATED_DAYS", "14"))
+MARKDOWN_POOL_SIZE = int(os.getenv("MARKDOWN_POOL_SIZE", "4"))
+SANITIZER_BACKEND = os.getenv("SANITIZER_BACKEND", "bleach").strip().lower()
+
+RENDER_CACHE_ENABLED = os.getenv("RENDER_CACHE_ENABLED", "1").strip().lower() in {"1", "true", "yes", "on"}
+RENDER_CACHE_DIR = os.getenv("RENDER_CACHE_DIR", os.path.join(os.path.dirname(__file__), 'data', 'render_cache'))
+RENDER_CACHE_MAX_BYTES = int(os.getenv("RENDER_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+RENDER_CACHE_READONLY = os.getenv("RENDER_CACHE_READONLY", "0").strip().lower() in {"1", "true", "yes", "on"}
+BLOCK_CACHE_ENABLED = os.getenv("BLOCK_CACHE_ENABLED", "1").strip().lower() in {"1", "true", "yes", "on"}
+BLOCK_CACHE_MAX_ENTRIES = int(os.getenv("BLOCK_CACHE_MAX_ENTRIES", "2048"))
+RENDER_WORKERS = int(os.getenv("RENDER_WORKERS", "0"))
+RENDER_TIMEOUT_SECONDS = float(os.getenv("RENDER_TIMEOUT_SECONDS", "10"))
+RENDER_MAX_INPUT_BYTES = int(os.getenv("RENDER_MAX_INPUT_BYTES", str(2 * 1024 * 1024)))
+RENDER_PROFILING_ENABLED = os.getenv("RENDER_PROFILING_ENABLED", "1").strip().lower() in {"1", "true", "yes", "on"}
+DEBUG_STATS_ENABLED = os.getenv("DEBUG_STATS_ENABLED", "0").strip().lower() in {"1", "true", "yes", "on"}
+SLOW_RENDER_THRESHOLD_MS = float(os.getenv("SLOW_RENDER_THRESHOLD_MS", "250"))
+SLOW_RENDER_LOG_ENTRIES = int(os.getenv("SLOW_RENDER_LOG_ENTRIES", "100"))
+SLOW_RENDER_LOG_FILE = os.getenv("SLOW_RENDER_LOG_FILE", "").strip()
+SLOW_RENDER_LOG_MAX_BYTES = int(os.getenv("SLOW_RENDER_LOG_MAX_BYTES", str(1024 * 1024)))
+SLOW_RENDER_LOG_BACKUPS = int(os.getenv("SLOW_RENDER_LOG_BACKUPS", "3"))
+EMBED_STORE_ENABLED = os.getenv("EMBED_STORE_ENABLED", "0").strip().lower() in {"1", "true", "yes", "on"}
+EMBED_STORE_DIR = os.getenv("EMBED_STORE_DIR", os.path.join(os.path.dirname(__file__), 'data', 'embeds'))
+EMBED_PAYLOAD_VALIDATE = os.getenv("EMBED_PAYLOAD_VALIDATE", "warn").strip().lower()
+EMBED_PAYLOAD_COMPACT = os.getenv("EMBED_PAYLOAD_COMPACT", "0").strip().lower() in {"1", "true", "yes", "on"}
+EMBED_PAYLOAD_CACHE_ENTRIES = int(os.getenv("EMBED_PAYLOAD_CACHE_ENTRIES", "1024"))
+SYNTAX_HIGHLIGHT_MODE = os.getenv("SYNTAX_HIGHLIGHT_MODE", "client").strip().lower()
+SYNTAX_HIGHLIGHT_STYLE = os.getenv("SYNTAX_HIGHLIGHT_STYLE", "one-dark").strip()
+SYNTAX_HIGHLIGHT_CACHE_ENTRIES = int(os.getenv("SYNTAX_HIGHLIGHT_CACHE_ENTRIES", "4096"))
+SIDEBAR_MODE = os.getenv("SIDEBAR_MODE", "full").strip().lower()
 
 DATABASE_CONFIG = {
     'type': os.getenv('DB_TYPE', 'sqlite'),
@@ -0,0 +1,13 @@
+def get_counter(md, name):
+    # Engines rendering a document block by block carry the counters over
+    # between blocks so generated ids match a whole-document render.
+    counters = getattr(md, 'mdoc_counters', None)
+    if counters is None:
+        return 0
+    return counters.get(name, 0)
+
+
+def set_counter(md, name, value):
+    counters = getattr(md, 'mdoc_counters', None)
+    if counters is not None:
+        counters[name] = value
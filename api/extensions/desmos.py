@@ -1,46 +1,31 @@
-
 from markdown.extensions import Extension
-from markdown.preprocessors import Preprocessor
-import re
-import json
-import base64
+from api.extensions.fences import FenceHandler, register_fence_handler
+from api.extensions.sanitizer import mark_trusted
+from api.utils.embed_store import payload_attribute
+from api.utils.embed_payloads import prepare_payload, payload_error_html
+
+class DesmosFenceHandler(FenceHandler):
+    name = 'desmos'
+
+    def open(self, stripped):
+        return {} if stripped == '```desmos' else None
+
+    def render(self, state, lines):
+        counter = self.next_id()
+        config_json, error = prepare_payload('json', '\n'.join(lines))
+        if error:
+            return mark_trusted(self.md, payload_error_html('Desmos graph config', error))
+        payload = payload_attribute('data-graph-config', config_json)
 
-class DesmosPreprocessor(Preprocessor):
-    def run(self, lines):
-        new_lines = []
-        in_desmos_block = False
-        desmos_config = []
-        counter = 0
-        
-        for line in lines:
-            if line.strip() == '```desmos':
-                in_desmos_block = True
-                desmos_config = []
-                continue
-            elif in_desmos_block and line.strip() == '```':
-                in_desmos_block = False
-                
-                config_json = '\n'.join(desmos_config)
-                safe_config = base64.b64encode(config_json.encode('utf-8')).decode('ascii')
-                
-                placeholder = (
-                    f'<div class="mdoc-desmos-graph" id="desmos-container-{counter}" '
-                    f'data-graph-config="{safe_config}"></div>'
-                )
-                new_lines.append(placeholder)
-                counter += 1
-                continue
-            
-            if in_desmos_block:
-                desmos_config.append(line)
-            else:
-                new_lines.append(line)
-                
-        return new_lines
+        placeholder = (
+            f'<div class="mdoc-desmos-graph" id="desmos-container-{counter}" '
+            f'{payload}></div>'
+        )
+        return mark_trusted(self.md, placeholder)
 
 class DesmosExtension(Extension):
     def extendMarkdown(self, md):
-        md.preprocessors.register(DesmosPreprocessor(md), 'desmos', 175)
+        register_fence_handler(md, DesmosFenceHandler(md), 'desmos', 175)
 
 def makeExtension(**kwargs):
-    return DesmosExtension(**kwargs)
\ No newline at end of file
+    return DesmosExtension(**kwargs)
@@ -0,0 +1,146 @@
+from markdown.extensions import Extension
+from markdown.treeprocessors import Treeprocessor
+from markdown.postprocessors import Postprocessor
+from markdown.util import HTML_PLACEHOLDER_RE
+from api.utils.table_of_contents import slugify_heading, add_ids_to_headings
+import re
+
+HEADING_TAGS = {'h1', 'h2', 'h3', 'h4', 'h5', 'h6'}
+RAW_HEADING_RE = re.compile(r'<h[1-6]')
+EXTERNAL_LINK_ATTRIBUTES = (
+    ('target', '_blank'),
+    ('rel', 'noopener noreferrer'),
+    ('class', 'external-link-button'),
+)
+
+
+def decorate_external_links(html_content):
+    def enhance_external_link(match):
+        href = match.group(1)
+        rest_of_tag = match.group(2)
+
+        if href.startswith(('http://', 'https://')):
+            for name, value in EXTERNAL_LINK_ATTRIBUTES:
+                if f'{name}=' not in rest_of_tag:
+                    rest_of_tag += f' {name}="{value}"'
+
+        return f'<a href="{href}"{rest_of_tag}>'
+
+    return re.sub(r'<a href="([^"]*)"([^>]*)>', enhance_external_link, html_content)
+
+
+class DocumentTreeprocessor(Treeprocessor):
+    def run(self, root):
+        self.headings = []
+        self.drop_h1 = getattr(self.md, 'mdoc_drop_first_h1', False)
+        self.md.mdoc_dropped_heading_id = None
+        self._walk(root)
+        self.md.mdoc_headings = self.headings
+        self.md.mdoc_drop_first_h1 = self.drop_h1
+        self._fix_raw_html()
+
+    def _walk(self, parent):
+        for child in list(parent):
+            tag = child.tag
+            if tag in HEADING_TAGS:
+                if self.drop_h1 and tag == 'h1':
+                    self.drop_h1 = False
+                    self.md.mdoc_dropped_heading_id = child.get('id')
+                    self._remove(parent, child)
+                    continue
+
+                text = self._heading_text(child)
+                heading_id = child.get('id')
+                if not heading_id:
+                    heading_id = slugify_heading(text)
+                    child.set('id', heading_id)
+                self.headings.append({'level': int(tag[1]), 'id': heading_id, 'text': text})
+
+            elif tag == 'a':
+                href = child.get('href', '')
+                if href.startswith(('http://', 'https://')):
+                    for name, value in EXTERNAL_LINK_ATTRIBUTES:
+                        if child.get(name) is None:
+                            child.set(name, value)
+
+            if len(child):
+                self._walk(child)
+
+    def _heading_text(self, element):
+        text = ''.join(element.itertext())
+        if '\x02' in text:
+            text = HTML_PLACEHOLDER_RE.sub(self._stashed_text, text)
+            if 'unescape' in self.md.treeprocessors:
+                text = self.md.treeprocessors['unescape'].unescape(text)
+        return text.strip()
+
+    def _stashed_text(self, match):
+        try:
+            raw = self.md.htmlStash.rawHtmlBlocks[int(match.group(1))]
+        except (IndexError, ValueError):
+            return ''
+        return re.sub(r'<[^>]+>', '', raw) if isinstance(raw, str) else ''
+
+    @staticmethod
+    def _remove(parent, child):
+        # A whitespace tail is only the serializer's line break; keeping it
+        # would leave a blank line where the heading was.
+        if child.tail and child.tail.strip():
+            index = list(parent).index(child)
+            if index > 0:
+                previous = parent[index - 1]
+                previous.tail = (previous.tail or '') + child.tail
+            else:
+                parent.text = (parent.text or '') + child.tail
+        parent.remove(child)
+
+    def _fix_raw_html(self):
+        # Raw HTML (author markup and extension placeholders) never enters the
+        # tree, so only those stash fragments that can hold a heading or link
+        # get the string-level treatment. The sanitizer recognises trusted
+        # extension output by its exact text, so a rewritten trusted block is
+        # marked again: the passes only add ids and fixed link attributes.
+        blocks = self.md.htmlStash.rawHtmlBlocks
+        trusted = getattr(self.md, 'mdoc_trusted_html', None)
+        for index, block in enumerate(blocks):
+            if not isinstance(block, str):
+                continue
+            has_heading = RAW_HEADING_RE.search(block) is not None
+            has_link = '<a href="http' in block
+            if not (has_heading or has_link):
+                continue
+            fixed = block
+            if has_heading:
+                fixed = add_ids_to_headings(fixed)
+            if has_link:
+                fixed = decorate_external_links(fixed)
+            if fixed == block:
+                continue
+            if trusted is not None and block.strip() in trusted:
+                trusted.add(fixed.strip())
+            blocks[index] = fixed
+
+
+class TrailingWhitespacePostprocessor(Postprocessor):
+    # Markdown.convert() strips the output; keep what it drops from the end so
+    # separately rendered blocks can be joined exactly like a single render.
+    def run(self, text):
+        self.md.mdoc_trailing_whitespace = text[len(text.rstrip()):]
+        return text
+
+
+class DocumentTreeExtension(Extension):
+    def extendMarkdown(self, md):
+        md.registerExtension(self)
+        self.md = md
+        md.mdoc_nested_headings = None
+        md.treeprocessors.register(DocumentTreeprocessor(md), 'mdoc-document', 4)
+        md.postprocessors.register(TrailingWhitespacePostprocessor(md), 'mdoc-trailing-whitespace', 0)
+
+    def reset(self):
+        # Filled by tab panels and hint bodies rendered for this page.
+        self.md.mdoc_nested_headings = None
+
+
+def makeExtension(**kwargs):
+    return DocumentTreeExtension(**kwargs)
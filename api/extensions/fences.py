@@ -0,0 +1,122 @@
+from markdown.extensions import Extension
+from markdown.preprocessors import Preprocessor
+from markdown.util import Registry
+from api.extensions.counters import get_counter, set_counter
+from api.utils.profiling import fence_block
+import abc
+
+
+class FenceHandler(abc.ABC):
+    name = None
+    line_prefix = None
+
+    def __init__(self, md):
+        self.md = md
+
+    def open(self, stripped):
+        return None
+
+    def closes(self, state, line):
+        return line.strip() == '```'
+
+    @abc.abstractmethod
+    def render(self, state, lines):
+        pass
+
+    def render_unclosed(self, state, lines):
+        # None leaves the opening line and the body as ordinary markdown.
+        return None
+
+    def render_line(self, stripped):
+        return None
+
+    def next_id(self):
+        counter = get_counter(self.md, self.name)
+        set_counter(self.md, self.name, counter + 1)
+        return counter
+
+
+class FenceDispatcher(Preprocessor):
+    def __init__(self, md):
+        super().__init__(md)
+        self.handlers = Registry()
+
+    def run(self, lines):
+        if getattr(self.md, 'mdoc_counters', None) is None:
+            self.md.mdoc_counters = {}
+
+        handlers = list(self.handlers)
+        line_handlers = [handler for handler in handlers if handler.line_prefix]
+        new_lines = []
+        handler = None
+        state = None
+        opening = None
+        opening_line = None
+        body = []
+
+        for line in lines:
+            if handler is not None:
+                if handler.closes(state, line):
+                    with fence_block(handler.name, opening):
+                        new_lines.append(handler.render(state, body))
+                    handler = None
+                else:
+                    body.append(line)
+                continue
+
+            stripped = line.strip()
+            if stripped.startswith(('```', '~~~')):
+                for candidate in handlers:
+                    state = candidate.open(stripped)
+                    if state is not None:
+                        handler = candidate
+                        opening = stripped
+                        opening_line = line
+                        body = []
+                        break
+                if handler is not None:
+                    continue
+                new_lines.append(line)
+                continue
+
+            for line_handler in line_handlers:
+                if stripped.startswith(line_handler.line_prefix):
+                    rendered = line_handler.render_line(stripped)
+                    if rendered is not None:
+                        new_lines.append(rendered)
+                        break
+            else:
+                new_lines.append(line)
+
+        if handler is not None:
+            with fence_block(handler.name, opening):
+                rendered = handler.render_unclosed(state, body)
+            if rendered is not None:
+                new_lines.append(rendered)
+            else:
+                new_lines.append(opening_line)
+                new_lines.extend(body)
+
+        return new_lines
+
+
+class FenceExtension(Extension):
+    def extendMarkdown(self, md):
+        md.registerExtension(self)
+        self.md = md
+        md.preprocessors.register(FenceDispatcher(md), 'mdoc-fences', 176)
+
+    def reset(self):
+        self.md.mdoc_counters = None
+
+
+def register_fence_handler(md, handler, name, priority):
+    # Every embed shares one scan of the document: the first extension to
+    # register a handler installs the dispatcher.
+    if 'mdoc-fences' not in md.preprocessors:
+        FenceExtension().extendMarkdown(md)
+    md.preprocessors['mdoc-fences'].handlers.register(handler, name, priority)
+
+
+def makeExtension(**kwargs):
+    return FenceExtension(**kwargs)
@@ -1,44 +1,31 @@
 from markdown.extensions import Extension
-from markdown.preprocessors import Preprocessor
-import re
-import base64
+from api.extensions.fences import FenceHandler, register_fence_handler
+from api.extensions.sanitizer import mark_trusted
+from api.utils.embed_store import payload_attribute
+from api.utils.embed_payloads import prepare_payload, payload_error_html
 
-class GeoGebraPreprocessor(Preprocessor):
-    def run(self, lines):
-        new_lines = []
-        in_geogebra_block = False
-        config_lines = []
-        counter = 0
-        
-        for line in lines:
-            if line.strip() == '```geogebra':
-                in_geogebra_block = True
-                config_lines = []
-                continue
-            elif in_geogebra_block and line.strip() == '```':
-                in_geogebra_block = False
-                
-                config_str = '\n'.join(config_lines)
-                safe_config = base64.b64encode(config_str.encode('utf-8')).decode('ascii')
-                
-                placeholder = (
-                    f'<div class="mdoc-geogebra" id="geogebra-container-{counter}" '
-                    f'data-geogebra-config="{safe_config}"></div>'
-                )
-                new_lines.append(placeholder)
-                counter += 1
-                continue
-            
-            if in_geogebra_block:
-                config_lines.append(line)
-            else:
-                new_lines.append(line)
-                
-        return new_lines
+class GeoGebraFenceHandler(FenceHandler):
+    name = 'geogebra'
+
+    def open(self, stripped):
+        return {} if stripped == '```geogebra' else None
+
+    def render(self, state, lines):
+        counter = self.next_id()
+        config_str, error = prepare_payload('json', '\n'.join(lines))
+        if error:
+            return mark_trusted(self.md, payload_error_html('GeoGebra config', error))
+        payload = payload_attribute('data-geogebra-config', config_str)
+
+        placeholder = (
+            f'<div class="mdoc-geogebra" id="geogebra-container-{counter}" '
+            f'{payload}></div>'
+        )
+        return mark_trusted(self.md, placeholder)
 
 class GeoGebraExtension(Extension):
     def extendMarkdown(self, md):
-        md.preprocessors.register(GeoGebraPreprocessor(md), 'geogebra', 174)
+        register_fence_handler(md, GeoGebraFenceHandler(md), 'geogebra', 174)
 
 def makeExtension(**kwargs):
-    return GeoGebraExtension(**kwargs)
\ No newline at end of file
+    return GeoGebraExtension(**kwargs)
@@ -1,103 +1,57 @@
 from markdown.extensions import Extension
-from markdown.preprocessors import Preprocessor
+from api.extensions.fences import FenceHandler, register_fence_handler
+from api.extensions.sanitizer import mark_trusted
+from api.utils.embed_store import payload_attribute
+from api.utils.embed_payloads import prepare_payload, payload_error_html
 import re
-import base64
 
-class GlslPreprocessor(Preprocessor):
-    def run(self, lines):
-        new_lines = []
-        in_glsl_block = False
-        glsl_code = []
-        canvas_count = 0
-        simple_display = False
-        no_ui = False
-        width = None
-        height = None
-        
-        for line in lines:
+class GlslFenceHandler(FenceHandler):
+    name = 'glsl'
 
-            if line.strip() == '```glsl simple' or re.match(r'```glsl\s+simple\s*.*', line.strip()):
-                in_glsl_block = True
-                glsl_code = []
-                simple_display = True
-                no_ui = False
-                width = None
-                height = None
-                
+    def open(self, stripped):
+        if stripped == '```glsl simple' or re.match(r'```glsl\s+simple\s*.*', stripped):
+            match = re.match(r'```glsl\s+simple\s+(\d+)x(\d+)', stripped)
+            return {'simple_display': True, 'no_ui': False, 'size': match.groups() if match else None}
+        elif stripped == '```glsl noui' or re.match(r'```glsl\s+noui\s*.*', stripped):
+            match = re.match(r'```glsl\s+noui\s+(\d+)x(\d+)', stripped)
+            return {'simple_display': False, 'no_ui': True, 'size': match.groups() if match else None}
+        elif stripped == '```glsl':
+            return {'simple_display': False, 'no_ui': False, 'size': None}
+        return None
 
-                match = re.match(r'```glsl\s+simple\s+(\d+)x(\d+)', line.strip())
-                if match:
-                    width, height = match.groups()
-                continue
-            elif line.strip() == '```glsl noui' or re.match(r'```glsl\s+noui\s*.*', line.strip()):
-                in_glsl_block = True
-                glsl_code = []
-                simple_display = False
-                no_ui = True
-                width = None
-                height = None
-                
+    def render(self, state, lines):
+        canvas_count = self.next_id()
+        shader_content, error = prepare_payload('glsl', '\n'.join(lines))
+        if error:
+            return mark_trusted(self.md, payload_error_html('GLSL shader', error))
+        payload = payload_attribute('data-fragment-shader', shader_content)
 
-                match = re.match(r'```glsl\s+noui\s+(\d+)x(\d+)', line.strip())
-                if match:
-                    width, height = match.groups()
-                continue
-            elif line.strip() == '```glsl':
-                in_glsl_block = True
-                glsl_code = []
-                simple_display = False
-                no_ui = False
-                width = None
-                height = None
-                continue
-            elif in_glsl_block and line.strip() == '```':
-                in_glsl_block = False
-                
-
-                if glsl_code is None:
-                    glsl_code = []
-                    
-                shader_content = '\n'.join(glsl_code)
-                safe_code = base64.b64encode(shader_content.encode('utf-8')).decode('ascii')
-                
-                if simple_display:
-                    placeholder = (
-                        f'<div class="mdoc-glsl-canvas" id="glsl-container-{canvas_count}" '
-                        f'data-fragment-shader="{safe_code}" data-simple-display="true"'
-                    )
-                    if width and height:
-                        placeholder += f' data-width="{width}" data-height="{height}"'
-                    placeholder += '></div>'
-                elif no_ui:
-                    placeholder = (
-                        f'<div class="mdoc-glsl-canvas" id="glsl-container-{canvas_count}" '
-                        f'data-fragment-shader="{safe_code}" data-no-ui="true"'
-                    )
-                    if width and height:
-                        placeholder += f' data-width="{width}" data-height="{height}"'
-                    placeholder += '></div>'
-                else:
-                    placeholder = (
-                        f'<div class="mdoc-glsl-canvas" id="glsl-container-{canvas_count}" '
-                        f'data-fragment-shader="{safe_code}"></div>'
-                    )
-                new_lines.append(placeholder)
-                canvas_count += 1
-                
-                width = None
-                height = None
-                continue
-            
-            if in_glsl_block:
-                glsl_code.append(line)
-            else:
-                new_lines.append(line)
-                
-        return new_lines
+        if state['simple_display']:
+            placeholder = (
+                f'<div class="mdoc-glsl-canvas" id="glsl-container-{canvas_count}" '
+                f'{payload} data-simple-display="true"'
+            )
+            if state['size']:
+                placeholder += ' data-width="{}" data-height="{}"'.format(*state['size'])
+            placeholder += '></div>'
+        elif state['no_ui']:
+            placeholder = (
+                f'<div class="mdoc-glsl-canvas" id="glsl-container-{canvas_count}" '
+                f'{payload} data-no-ui="true"'
+            )
+            if state['size']:
+                placeholder += ' data-width="{}" data-height="{}"'.format(*state['size'])
+            placeholder += '></div>'
+        else:
+            placeholder = (
+                f'<div class="mdoc-glsl-canvas" id="glsl-container-{canvas_count}" '
+                f'{payload}></div>'
+            )
+        return mark_trusted(self.md, placeholder)
 
 class GlslExtension(Extension):
     def extendMarkdown(self, md):
-        md.preprocessors.register(GlslPreprocessor(md), 'glsl', 175)
+        register_fence_handler(md, GlslFenceHandler(md), 'glsl', 175)
 
 def makeExtension(**kwargs):
     return GlslExtension(**kwargs)
@@ -0,0 +1,35 @@
+from markdown.extensions import Extension
+from markdown.treeprocessors import Treeprocessor
+from api.utils.syntax_highlight import HIGHLIGHT_CLASS, highlight_code
+import html
+import re
+
+# fenced_code stashes "<pre><code class="language-x">...</code></pre>"; the
+# sanitizer writes it back in the same shape.
+CODE_BLOCK_RE = re.compile(r'^<pre><code class="language-([\w+#.-]+)">(.*)</code></pre>$', re.DOTALL)
+
+
+class HighlightTreeprocessor(Treeprocessor):
+    def run(self, root):
+        blocks = self.md.htmlStash.rawHtmlBlocks
+        for index, block in enumerate(blocks):
+            if not isinstance(block, str) or not block.startswith('<pre><code class="language-'):
+                continue
+            match = CODE_BLOCK_RE.match(block)
+            if not match:
+                continue
+            language = match.group(1)
+            highlighted = highlight_code(html.unescape(match.group(2)), language)
+            if highlighted is not None:
+                blocks[index] = f'<pre><code class="language-{language} {HIGHLIGHT_CLASS}">{highlighted}</code></pre>'
+
+
+class HighlightExtension(Extension):
+    def extendMarkdown(self, md):
+        # After mdoc-sanitize: Pygments output is escaped text in class-only
+        # spans and does not need another pass.
+        md.treeprocessors.register(HighlightTreeprocessor(md), 'mdoc-highlight', 2)
+
+
+def makeExtension(**kwargs):
+    return HighlightExtension(**kwargs)
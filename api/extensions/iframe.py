@@ -1,53 +1,39 @@
 from markdown.extensions import Extension
-from markdown.preprocessors import Preprocessor
+from api.extensions.fences import FenceHandler, register_fence_handler
 import re
 import urllib.parse
 
-class IframePreprocessor(Preprocessor):
-    def run(self, lines):
-        new_lines = []
-        in_iframe_block = False
+class IframeFenceHandler(FenceHandler):
+    name = 'iframe'
+    line_prefix = '![iframe]'
+
+    def open(self, stripped):
+        return {} if stripped == '```iframe' else None
+
+    def render(self, state, lines):
         iframe_config = {}
-        counter = 0
-        
         for line in lines:
-            if line.strip() == '```iframe':
-                in_iframe_block = True
-                iframe_config = {}
-                continue
-            elif in_iframe_block and line.strip() == '```':
-                in_iframe_block = False
-                
-                placeholder = self._create_iframe_embed(iframe_config, counter)
-                new_lines.append(placeholder)
-                counter += 1
-                continue
-            elif in_iframe_block:
-                self._parse_config_line(line, iframe_config)
-                continue
-            
-            iframe_match = re.match(r'^!\[iframe\]\(([^)]+)\)(?:\{([^}]+)\})?', line.strip())
-            if iframe_match:
-                url = iframe_match.group(1)
-                options = iframe_match.group(2) or ""
-                
-                config = {'url': url}
-                if options:
-                    for option in options.split(','):
-                        if '=' in option:
-                            key, value = option.strip().split('=', 1)
-                            config[key] = value
-                        else:
-                            config[option.strip()] = True
-                
-                placeholder = self._create_iframe_embed(config, counter)
-                new_lines.append(placeholder)
-                counter += 1
-                continue
-            
-            new_lines.append(line)
-                
-        return new_lines
+            self._parse_config_line(line, iframe_config)
+        return self._create_iframe_embed(iframe_config, self.next_id())
+
+    def render_line(self, stripped):
+        iframe_url_match = re.match(r'^!\[iframe\]\(([^)]+)\)(?:\{([^}]+)\})?', stripped)
+        if not iframe_url_match:
+            return None
+
+        url = iframe_url_match.group(1)
+        options = iframe_url_match.group(2) or ""
+
+        config = {'url': url}
+        if options:
+            for option in options.split(','):
+                if '=' in option:
+                    key, value = option.strip().split('=', 1)
+                    config[key] = value
+                else:
+                    config[option.strip()] = True
+
+        return self._create_iframe_embed(config, self.next_id())
     
     def _parse_config_line(self, line, config):
         line = line.strip()
@@ -113,7 +99,7 @@ class IframePreprocessor(Preprocessor):
 
 class IframeExtension(Extension):
     def extendMarkdown(self, md):
-        md.preprocessors.register(IframePreprocessor(md), 'iframe', 171)
+        register_fence_handler(md, IframeFenceHandler(md), 'iframe', 171)
 
 def makeExtension(**kwargs):
     return IframeExtension(**kwargs)
\ No newline at end of file
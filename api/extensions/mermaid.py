@@ -1,57 +1,38 @@
 from markdown.extensions import Extension
-from markdown.preprocessors import Preprocessor
-import re
-import base64
+from api.extensions.fences import FenceHandler, register_fence_handler
+from api.extensions.sanitizer import mark_trusted
+from api.utils.embed_store import payload_attribute
 
-class MermaidPreprocessor(Preprocessor):
-    def run(self, lines):
-        new_lines = []
-        in_mermaid_block = False
-        mermaid_lines = []
-        counter = 0
-        simple_display = False
-        
-        for line in lines:
-            if line.strip() == '```mermaid simple':
-                in_mermaid_block = True
-                mermaid_lines = []
-                simple_display = True
-                continue
-            elif line.strip() == '```mermaid':
-                in_mermaid_block = True
-                mermaid_lines = []
-                simple_display = False
-                continue
-            elif in_mermaid_block and line.strip() == '```':
-                in_mermaid_block = False
-                
-                diagram_definition = '\n'.join(mermaid_lines)
-                safe_diagram = base64.b64encode(diagram_definition.encode('utf-8')).decode('ascii')
-                
-                if simple_display:
-                    placeholder = (
-                        f'<div class="mdoc-mermaid" id="mermaid-diagram-{counter}" '
-                        f'data-diagram="{safe_diagram}" data-simple-display="true"></div>'
-                    )
-                else:
-                    placeholder = (
-                        f'<div class="mdoc-mermaid" id="mermaid-diagram-{counter}" '
-                        f'data-diagram="{safe_diagram}"></div>'
-                    )
-                new_lines.append(placeholder)
-                counter += 1
-                continue
-            
-            if in_mermaid_block:
-                mermaid_lines.append(line)
-            else:
-                new_lines.append(line)
-                
-        return new_lines
+class MermaidFenceHandler(FenceHandler):
+    name = 'mermaid'
+
+    def open(self, stripped):
+        if stripped == '```mermaid simple':
+            return {'simple_display': True}
+        elif stripped == '```mermaid':
+            return {'simple_display': False}
+        return None
+
+    def render(self, state, lines):
+        counter = self.next_id()
+        diagram_definition = '\n'.join(lines)
+        payload = payload_attribute('data-diagram', diagram_definition)
+
+        if state['simple_display']:
+            placeholder = (
+                f'<div class="mdoc-mermaid" id="mermaid-diagram-{counter}" '
+                f'{payload} data-simple-display="true"></div>'
+            )
+        else:
+            placeholder = (
+                f'<div class="mdoc-mermaid" id="mermaid-diagram-{counter}" '
+                f'{payload}></div>'
+            )
+        return mark_trusted(self.md, placeholder)
 
 class MermaidExtension(Extension):
     def extendMarkdown(self, md):
-        md.preprocessors.register(MermaidPreprocessor(md), 'mermaid', 176)
+        register_fence_handler(md, MermaidFenceHandler(md), 'mermaid', 176)
 
 def makeExtension(**kwargs):
-    return MermaidExtension(**kwargs)
\ No newline at end of file
+    return MermaidExtension(**kwargs)
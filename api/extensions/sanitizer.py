@@ -0,0 +1,230 @@
+from markdown.extensions import Extension
+from markdown.treeprocessors import Treeprocessor
+from markdown.postprocessors import RawHtmlPostprocessor
+from html.parser import HTMLParser
+from html.entities import html5 as HTML5_ENTITIES
+import html
+import re
+import urllib.parse
+
+URI_ATTRIBUTES = {'href', 'src', 'poster', 'action', 'formaction', 'cite', 'longdesc', 'background', 'xlink:href'}
+VOID_TAGS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'source', 'track', 'wbr'}
+
+
+def mark_trusted(md, html_fragment):
+    # Extension output built only from escaped or encoded data can skip
+    # re-validation; engines without the tree sanitizer simply ignore this.
+    trusted = getattr(md, 'mdoc_trusted_html', None)
+    if trusted is not None:
+        trusted.add(html_fragment.strip())
+    return html_fragment
+
+
+def escape_attribute(value):
+    return value.replace('&', '&amp;').replace('"', '&quot;')
+
+
+def is_allowed_uri(value, protocols):
+    normalized = re.sub(r"[`\000-\040\177-\240\s]+", "", html.unescape(value))
+    normalized = re.sub(r"[^\x00-\x7f]", "", normalized).lower()
+
+    try:
+        scheme = urllib.parse.urlparse(normalized).scheme
+    except ValueError:
+        return False
+
+    if scheme:
+        return scheme in protocols
+    if normalized.startswith('#'):
+        return True
+    if ':' in normalized and normalized.split(':')[0] in protocols:
+        return True
+    return 'http' in protocols or 'https' in protocols
+
+
+class FragmentSanitizer(HTMLParser):
+    def __init__(self, tags, attributes, protocols):
+        super().__init__(convert_charrefs=False)
+        self.tags = tags
+        # HTMLParser lowercases attribute names; keep the allowlisted spelling
+        # (e.g. svg viewBox) when writing them back out.
+        self.attributes = {tag: {name.lower(): name for name in names} for tag, names in attributes.items()}
+        self.protocols = protocols
+        self.parts = []
+
+    def sanitize(self, fragment):
+        self.parts = []
+        self.reset()
+        self.feed(fragment)
+        self.close()
+        return ''.join(self.parts)
+
+    def _filter_attributes(self, tag, attrs):
+        allowed = self.attributes.get(tag, {})
+        rendered = []
+        for name, value in attrs:
+            name = allowed.get(name)
+            if name is None:
+                continue
+            value = value or ''
+            if name in URI_ATTRIBUTES and not is_allowed_uri(value, self.protocols):
+                continue
+            rendered.append(f' {name}="{escape_attribute(value)}"')
+        return ''.join(rendered)
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.tags:
+            self.parts.append(f'<{tag}{self._filter_attributes(tag, attrs)}>')
+        else:
+            self.parts.append(html.escape(self.get_starttag_text(), quote=False))
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag in self.tags and tag not in VOID_TAGS:
+            self.parts.append(f'</{tag}>')
+
+    def handle_endtag(self, tag):
+        if tag in self.tags:
+            if tag not in VOID_TAGS:
+                self.parts.append(f'</{tag}>')
+        else:
+            self.parts.append(f'&lt;/{tag}&gt;')
+
+    def handle_data(self, data):
+        self.parts.append(html.escape(data, quote=False))
+
+    def handle_entityref(self, name):
+        if f'{name};' in HTML5_ENTITIES:
+            self.parts.append(f'&{name};')
+        else:
+            self.parts.append(f'&amp;{name};')
+
+    def handle_charref(self, name):
+        self.parts.append(f'&#{name};')
+
+    def handle_comment(self, data):
+        # Browsers end a comment earlier than HTMLParser may: at "<!-->",
+        # "<!--->" or "--!>". Whatever follows is markup, not comment text.
+        if data.startswith('>'):
+            comment, rest = '', data[1:]
+        elif data.startswith('->'):
+            comment, rest = '', data[2:]
+        elif '--!>' in data:
+            comment, rest = data.split('--!>', 1)
+        else:
+            self.parts.append(f'<!--{data}-->')
+            return
+        self.parts.append(f'<!--{comment}-->')
+        inner = FragmentSanitizer({}, {}, self.protocols)
+        inner.tags = self.tags
+        inner.attributes = self.attributes
+        self.parts.append(inner.sanitize(rest + '-->'))
+
+    def handle_decl(self, decl):
+        self.parts.append(html.escape(f'<!{decl}>', quote=False))
+
+    def handle_pi(self, data):
+        self.parts.append(html.escape(f'<?{data}>', quote=False))
+
+    def unknown_decl(self, data):
+        self.parts.append(html.escape(f'<![{data}]>', quote=False))
+
+
+class SanitizerTreeprocessor(Treeprocessor):
+    def __init__(self, md, tags, attributes, protocols):
+        super().__init__(md)
+        self.tags = set(tags)
+        self.attributes = {tag: set(names) for tag, names in attributes.items()}
+        self.protocols = set(protocols)
+
+    def run(self, root):
+        self._sanitize_children(root)
+        self._sanitize_stash()
+
+    def _sanitize_children(self, parent):
+        for element in parent:
+            tag = element.tag
+            if isinstance(tag, str):
+                if tag in self.tags:
+                    self._filter_attributes(element)
+                else:
+                    self._escape_element(element)
+            if len(element):
+                self._sanitize_children(element)
+
+    def _filter_attributes(self, element):
+        allowed = self.attributes.get(element.tag, ())
+        for name in list(element.attrib):
+            if name not in allowed:
+                del element.attrib[name]
+            elif name in URI_ATTRIBUTES and not is_allowed_uri(element.attrib[name], self.protocols):
+                del element.attrib[name]
+
+    @staticmethod
+    def _escape_element(element):
+        # Same as bleach with strip=False: the markup is kept, as text.
+        tag = element.tag
+        attrs = ''.join(f' {name}="{value}"' for name, value in element.attrib.items())
+        element.attrib.clear()
+        element.tag = None
+        element.text = f'<{tag}{attrs}>' + (element.text or '')
+        if tag in VOID_TAGS:
+            return
+        if len(element):
+            last = element[-1]
+            last.tail = (last.tail or '') + f'</{tag}>'
+        else:
+            element.text += f'</{tag}>'
+
+    def _sanitize_stash(self):
+        trusted = self.md.mdoc_trusted_html
+        fragment_sanitizer = None
+        blocks = self.md.htmlStash.rawHtmlBlocks
+
+        raw_html = self.md.postprocessors['raw_html']
+        escaped_blocks = self.md.mdoc_escaped_blocks
+
+        for index, block in enumerate(blocks):
+            if not isinstance(block, str) or block.strip() in trusted:
+                continue
+            if fragment_sanitizer is None:
+                fragment_sanitizer = FragmentSanitizer(self.tags, self.attributes, self.protocols)
+            sanitized = fragment_sanitizer.sanitize(block)
+            if raw_html.isblocklevel(block) and not raw_html.isblocklevel(sanitized):
+                escaped_blocks.add(sanitized)
+            blocks[index] = sanitized
+
+
+class SanitizedRawHtmlPostprocessor(RawHtmlPostprocessor):
+    # A block whose outer tag was escaped is still a block: don't let it be
+    # wrapped in <p> just because it now starts with "&lt;".
+    def isblocklevel(self, html):
+        return html in self.md.mdoc_escaped_blocks or super().isblocklevel(html)
+
+
+class SanitizerExtension(Extension):
+    def __init__(self, tags=(), attributes=None, protocols=(), **kwargs):
+        self.tags = tags
+        self.attributes = attributes or {}
+        self.protocols = protocols
+        super().__init__(**kwargs)
+
+    def extendMarkdown(self, md):
+        md.registerExtension(self)
+        self.md = md
+        md.mdoc_trusted_html = set()
+        md.mdoc_escaped_blocks = set()
+        md.postprocessors.register(SanitizedRawHtmlPostprocessor(md), 'raw_html', 30)
+        md.treeprocessors.register(
+            SanitizerTreeprocessor(md, self.tags, self.attributes, self.protocols),
+            'mdoc-sanitize',
+            3,
+        )
+
+    def reset(self):
+        self.md.mdoc_trusted_html = set()
+        self.md.mdoc_escaped_blocks = set()
+
+
+def makeExtension(**kwargs):
+    return SanitizerExtension(**kwargs)
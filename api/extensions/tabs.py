@@ -1,144 +1,101 @@
 from markdown.extensions import Extension
-from markdown.preprocessors import Preprocessor
+from api.extensions.fences import FenceHandler, register_fence_handler
+from api.extensions.sanitizer import mark_trusted
+import html
 import re
 
 
-class TabsPreprocessor(Preprocessor):
-    def run(self, lines):
-        new_lines = []
-        in_tabs = False
-        tabs_fence = None
+class TabsFenceHandler(FenceHandler):
+    name = "tabs"
+
+    def open(self, stripped):
+        fence_match = re.match(r"^(`{3,})tabs\s*$", stripped)
+        return {"fence": fence_match.group(1)} if fence_match else None
+
+    def closes(self, state, line):
+        return line.strip() == state["fence"]
+
+    def _split_tabs(self, lines):
+        tabs = []
         tab_title = None
         tab_lines = []
-        tabs = []
-        counter = 0
-
-        def flush_tab():
-            nonlocal tab_title, tab_lines, tabs
-            if tab_title is None:
-                return
-            tabs.append((tab_title, "\n".join(tab_lines).strip("\n")))
-            tab_title = None
-            tab_lines = []
 
         for line in lines:
-            fence_match = re.match(r"^(`{3,})tabs\s*$", line.strip())
-            if not in_tabs and fence_match:
-                in_tabs = True
-                tabs_fence = fence_match.group(1)
-                tab_title = None
+            tab_match = re.match(r"^---\s*tab:\s*(.+?)\s*$", line)
+            if tab_match:
+                if tab_title is not None:
+                    tabs.append((tab_title, "\n".join(tab_lines).strip("\n")))
+                tab_title = tab_match.group(1).strip()
                 tab_lines = []
-                tabs = []
-                continue
-
-            if in_tabs:
-                if tabs_fence and line.strip() == tabs_fence:
-                    flush_tab()
-                    in_tabs = False
-                    tabs_fence = None
-
-                    if not tabs:
-                        new_lines.append(
-                            '<div class="mdoc-tabs mdoc-tabs-error">Error: empty tabs block.</div>',
-                        )
-                        continue
-
-                    group_id = f"tabs-{counter}"
-                    counter += 1
-
-                    try:
-                        import markdown
-                        from api.extensions.badge import BadgeExtension
-                        from api.extensions.desmos import DesmosExtension
-                        from api.extensions.geogebra import GeoGebraExtension
-                        from api.extensions.glsl import GlslExtension
-                        from api.extensions.hint import HintExtension
-                        from api.extensions.mermaid import MermaidExtension
-                        from api.extensions.p5js import P5jsExtension
-
-                        rendered_tabs = []
-                        for i, (title, content) in enumerate(tabs):
-                            html = markdown.markdown(
-                                content,
-                                extensions=[
-                                    "fenced_code",
-                                    "tables",
-                                    "md_in_html",
-                                    BadgeExtension(),
-                                    HintExtension(),
-                                    GlslExtension(),
-                                    DesmosExtension(),
-                                    MermaidExtension(),
-                                    GeoGebraExtension(),
-                                    P5jsExtension(),
-                                ],
-                                output_format="html5",
-                            )
-                            rendered_tabs.append((i, title, html))
-                    except Exception:
-                        rendered_tabs = [(i, t, f"<pre><code>{c}</code></pre>") for i, (t, c) in enumerate(tabs)]
-
-                    header_parts = []
-                    panel_parts = []
-                    for i, title, html in rendered_tabs:
-                        is_active = i == 0
-                        tab_id = f"{group_id}-tab-{i}"
-                        panel_id = f"{group_id}-panel-{i}"
-
-                        header_parts.append(
-                            (
-                                f'<button class="mdoc-tab{" is-active" if is_active else ""}" '
-                                f'type="button" id="{tab_id}" role="tab" '
-                                f'data-tab-group="{group_id}" data-tab="{i}" '
-                                f'aria-selected="{"true" if is_active else "false"}" '
-                                f'aria-controls="{panel_id}">{title}</button>'
-                            ),
-                        )
-
-                        panel_parts.append(
-                            (
-                                f'<div class="mdoc-tab-panel{" is-active" if is_active else ""}" '
-                                f'id="{panel_id}" role="tabpanel" '
-                                f'data-tab-group="{group_id}" data-tab="{i}" '
-                                f'aria-labelledby="{tab_id}">{html}</div>'
-                            ),
-                        )
-
-                    placeholder = (
-                        f'<div class="mdoc-tabs" id="{group_id}">'
-                        f'<div class="mdoc-tabs-header" role="tablist">'
-                        + "".join(header_parts)
-                        + "</div>"
-                        f'<div class="mdoc-tabs-panels">'
-                        + "".join(panel_parts)
-                        + "</div>"
-                        + "</div>"
-                    )
-                    new_lines.append(placeholder)
-                    continue
-
-                tab_match = re.match(r"^---\s*tab:\s*(.+?)\s*$", line)
-                if tab_match:
-                    flush_tab()
-                    tab_title = tab_match.group(1).strip()
-                    tab_lines = []
-                    continue
-
-                tab_lines.append(line)
                 continue
+            tab_lines.append(line)
 
-            new_lines.append(line)
-
-        if in_tabs:
-            flush_tab()
-            new_lines.append('<div class="mdoc-tabs mdoc-tabs-error">Error: unclosed tabs block.</div>')
-
-        return new_lines
+        if tab_title is not None:
+            tabs.append((tab_title, "\n".join(tab_lines).strip("\n")))
+        return tabs
+
+    def render(self, state, lines):
+        tabs = self._split_tabs(lines)
+        if not tabs:
+            return '<div class="mdoc-tabs mdoc-tabs-error">Error: empty tabs block.</div>'
+
+        # Taken before the panels render, so nested groups number after this one.
+        group_id = f"tabs-{self.next_id()}"
+
+        try:
+            from api.utils.markdown import render_nested_markdown
+
+            rendered_tabs = [
+                (i, title, render_nested_markdown(content, self.md))
+                for i, (title, content) in enumerate(tabs)
+            ]
+            rendered = True
+        except Exception:
+            rendered_tabs = [(i, t, f"<pre><code>{c}</code></pre>") for i, (t, c) in enumerate(tabs)]
+            rendered = False
+
+        header_parts = []
+        panel_parts = []
+        for i, title, panel_html in rendered_tabs:
+            is_active = i == 0
+            tab_id = f"{group_id}-tab-{i}"
+            panel_id = f"{group_id}-panel-{i}"
+
+            header_parts.append(
+                (
+                    f'<button class="mdoc-tab{" is-active" if is_active else ""}" '
+                    f'type="button" id="{tab_id}" role="tab" '
+                    f'data-tab-group="{group_id}" data-tab="{i}" '
+                    f'aria-selected="{"true" if is_active else "false"}" '
+                    f'aria-controls="{panel_id}">{html.escape(title, quote=False)}</button>'
+                ),
+            )
+
+            panel_parts.append(
+                (
+                    f'<div class="mdoc-tab-panel{" is-active" if is_active else ""}" '
+                    f'id="{panel_id}" role="tabpanel" '
+                    f'data-tab-group="{group_id}" data-tab="{i}" '
+                    f'aria-labelledby="{tab_id}">{panel_html}</div>'
+                ),
+            )
+
+        placeholder = (
+            f'<div class="mdoc-tabs" id="{group_id}">'
+            f'<div class="mdoc-tabs-header" role="tablist">'
+            + "".join(header_parts)
+            + "</div>"
+            f'<div class="mdoc-tabs-panels">'
+            + "".join(panel_parts)
+            + "</div>"
+            + "</div>"
+        )
+        return mark_trusted(self.md, placeholder) if rendered else placeholder
 
 
 class TabsExtension(Extension):
     def extendMarkdown(self, md):
-        md.preprocessors.register(TabsPreprocessor(md), "tabs", 165)
+        register_fence_handler(md, TabsFenceHandler(md), "tabs", 165)
 
 
 def makeExtension(**kwargs):
@@ -1,53 +1,39 @@
 from markdown.extensions import Extension
-from markdown.preprocessors import Preprocessor
+from api.extensions.fences import FenceHandler, register_fence_handler
 import re
 import urllib.parse
 
-class VideoPreprocessor(Preprocessor):
-    def run(self, lines):
-        new_lines = []
-        in_video_block = False
+class VideoFenceHandler(FenceHandler):
+    name = 'video'
+    line_prefix = '![video]'
+
+    def open(self, stripped):
+        return {} if stripped == '```video' else None
+
+    def render(self, state, lines):
         video_config = {}
-        counter = 0
-        
         for line in lines:
-            if line.strip() == '```video':
-                in_video_block = True
-                video_config = {}
-                continue
-            elif in_video_block and line.strip() == '```':
-                in_video_block = False
-                
-                placeholder = self._create_video_embed(video_config, counter)
-                new_lines.append(placeholder)
-                counter += 1
-                continue
-            elif in_video_block:
-                self._parse_config_line(line, video_config)
-                continue
-            
-            video_url_match = re.match(r'^!\[video\]\(([^)]+)\)(?:\{([^}]+)\})?', line.strip())
-            if video_url_match:
-                url = video_url_match.group(1)
-                options = video_url_match.group(2) or ""
-                
-                config = {'url': url}
-                if options:
-                    for option in options.split(','):
-                        if '=' in option:
-                            key, value = option.strip().split('=', 1)
-                            config[key] = value
-                        else:
-                            config[option.strip()] = True
-                
-                placeholder = self._create_video_embed(config, counter)
-                new_lines.append(placeholder)
-                counter += 1
-                continue
-            
-            new_lines.append(line)
-                
-        return new_lines
+            self._parse_config_line(line, video_config)
+        return self._create_video_embed(video_config, self.next_id())
+
+    def render_line(self, stripped):
+        video_url_match = re.match(r'^!\[video\]\(([^)]+)\)(?:\{([^}]+)\})?', stripped)
+        if not video_url_match:
+            return None
+
+        url = video_url_match.group(1)
+        options = video_url_match.group(2) or ""
+
+        config = {'url': url}
+        if options:
+            for option in options.split(','):
+                if '=' in option:
+                    key, value = option.strip().split('=', 1)
+                    config[key] = value
+                else:
+                    config[option.strip()] = True
+
+        return self._create_video_embed(config, self.next_id())
     
     def _parse_config_line(self, line, config):
         line = line.strip()
@@ -215,7 +201,7 @@ class VideoPreprocessor(Preprocessor):
 
 class VideoExtension(Extension):
     def extendMarkdown(self, md):
-        md.preprocessors.register(VideoPreprocessor(md), 'video', 172)
+        register_fence_handler(md, VideoFenceHandler(md), 'video', 172)
 
 def makeExtension(**kwargs):
     return VideoExtension(**kwargs)
\ No newline at end of file
@@ -0,0 +1,120 @@
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from api.config import DOCS_DIR
+from api.utils.documents import get_all_documents
+from api.utils.markdown import render_markdown_file, get_pipeline_fingerprint
+from api.utils.render_cache import render_cache
+
+logger = logging.getLogger(__name__)
+
+def _configure_cache(cache_dir):
+    if cache_dir:
+        render_cache.directory = cache_dir
+    render_cache.enabled = True
+    render_cache.readonly = False
+
+def _render_document(md_path):
+    start = time.perf_counter()
+    try:
+        rendered = render_markdown_file(md_path)
+    except Exception as e:
+        return md_path, (time.perf_counter() - start) * 1000, 0, [], str(e)
+    return md_path, (time.perf_counter() - start) * 1000, len(rendered.html.encode('utf-8')), sorted(rendered.features), None
+
+def collect_markdown_documents():
+    paths = []
+    for doc in get_all_documents():
+        if doc.get('is_virtual'):
+            continue
+        md_path = os.path.join(DOCS_DIR, *doc['filename'].split('/')) + '.md'
+        if os.path.isfile(md_path):
+            paths.append((doc['filename'], md_path))
+    return paths
+
+def prerender(workers=None, cache_dir=None):
+    _configure_cache(cache_dir)
+    documents = collect_markdown_documents()
+    filenames = {md_path: filename for filename, md_path in documents}
+    results = []
+
+    wall_start = time.perf_counter()
+    if workers == 1 or len(documents) <= 1:
+        for _, md_path in documents:
+            results.append(_render_document(md_path))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_configure_cache, initargs=(cache_dir,)) as executor:
+            futures = [executor.submit(_render_document, md_path) for _, md_path in documents]
+            for future in as_completed(futures):
+                results.append(future.result())
+    wall_ms = (time.perf_counter() - wall_start) * 1000
+
+    rendered = []
+    failed = []
+    for md_path, render_ms, size, features, error in results:
+        entry = {
+            'filename': filenames[md_path],
+            'path': os.path.relpath(md_path, DOCS_DIR),
+            'render_ms': round(render_ms, 2),
+            'bytes': size,
+            'features': features,
+        }
+        if error:
+            entry['error'] = error
+            failed.append(entry)
+        else:
+            rendered.append(entry)
+
+    rendered.sort(key=lambda x: x['render_ms'], reverse=True)
+    manifest = {
+        'fingerprint': get_pipeline_fingerprint(),
+        'generated_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'workers': workers or os.cpu_count(),
+        'wall_ms': round(wall_ms, 2),
+        'documents': rendered,
+        'failed': failed,
+    }
+    render_cache.write_manifest(manifest)
+    return manifest
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m api.prerender',
+        description='Render every Markdown document into the on-disk render cache.',
+    )
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='number of render processes (default: CPU count)')
+    parser.add_argument('--cache-dir', default=None, help='render cache directory (default: RENDER_CACHE_DIR)')
+    parser.add_argument('--clear', action='store_true', help='empty the render cache before rendering')
+    parser.add_argument('--json', action='store_true', help='print the manifest as JSON instead of a table')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+
+    _configure_cache(args.cache_dir)
+    if args.clear:
+        render_cache.clear()
+
+    manifest = prerender(workers=args.workers, cache_dir=args.cache_dir)
+
+    if args.json:
+        print(json.dumps(manifest, indent=2))
+    else:
+        for doc in manifest['documents']:
+            print(f"{doc['render_ms']:9.1f} ms  {doc['bytes']:>8} B  {doc['filename']}")
+        for doc in manifest['failed']:
+            print(f"   FAILED  {doc['filename']}: {doc['error']}")
+        total_render_ms = sum(doc['render_ms'] for doc in manifest['documents'])
+        print(
+            f"Rendered {len(manifest['documents'])} documents with {manifest['workers']} worker(s) "
+            f"in {manifest['wall_ms']:.1f} ms wall time ({total_render_ms:.1f} ms render time) "
+            f"into {render_cache.directory}"
+        )
+
+    return 1 if manifest['failed'] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
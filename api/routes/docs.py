@@ -1,17 +1,25 @@
 from flask import Blueprint, render_template, abort, request, Response, jsonify, redirect, url_for
 from markupsafe import Markup
+from werkzeug.exceptions import HTTPException
 import urllib.parse
 import os
 import hashlib
 import logging
 from email.utils import formatdate
-from api.utils.markdown import render_markdown_file
+from api.utils.markdown import render_markdown_file, render_degraded_document, get_markdown_pool_stats, convert_markdown_to_html, extract_title_from_markdown, extract_description_from_markdown
 from api.utils.github_utils import get_file_at_commit, get_template_history, get_document_contributors, get_document_author, is_recently_updated
+from api.utils.render_workers import RenderBudgetExceeded, render_workers, get_budget_offenders
+from api.utils.render_cache import render_cache
+from api.utils.block_cache import block_cache
+from api.utils.profiling import stage, timing_store
+from api.utils.slow_renders import slow_render_log
 from api.utils.sanitization import sanitize_filename, is_safe_path
-from api.utils.documents import get_all_documents, get_documents_by_section, get_subdocuments, get_first_subdocument, get_sibling_navigation
+from api.utils.documents import document_index, get_all_documents, get_documents_by_section, get_subdocuments, get_sibling_navigation, get_navigation, get_routes
 from api.utils.analytics import analytics_db
 from api.utils.sitemap_generator import generate_sitemap
-from api.config import SITE_CONFIG, GITHUB_REPO
+from api.utils.sidebar import get_sidebar
+from api.utils.cross_reference import get_reference_index
+from api.config import SITE_CONFIG, GITHUB_REPO, DOCS_DIR, DEBUG_STATS_ENABLED
 
 docs_bp = Blueprint('docs', __name__)
 logger = logging.getLogger(__name__)
@@ -48,11 +56,31 @@ def sitemap():
 def api_list_docs():
     try:
         documents = get_all_documents()
-        return jsonify(documents)
+        return jsonify([doc.as_dict() for doc in documents])
     except Exception as e:
         logger.error(f"Error listing documents: {e}")
         return jsonify({'error': 'Failed to retrieve documents'}), 500
 
+@docs_bp.route('/api/nav')
+def api_nav():
+    # ?section=<name> or ?parent=<folder> for one branch, neither for the
+    # list of sections.
+    try:
+        result = get_sidebar().payload(request.args.get('section'), request.args.get('parent'))
+        if result is None:
+            return jsonify({'error': 'Not found'}), 404
+        body, etag = result
+        if request.headers.get("If-None-Match") == etag:
+            response = Response(status=304)
+        else:
+            response = Response(body, mimetype='application/json')
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = "public, max-age=60, stale-while-revalidate=300"
+        return response
+    except Exception as e:
+        logger.error(f"Error building navigation: {e}")
+        return jsonify({'error': 'Failed to build navigation'}), 500
+
 @docs_bp.route('/api/docs/<path:doc_name>')
 def api_get_doc(doc_name):
     try:
@@ -61,7 +89,7 @@ def api_get_doc(doc_name):
 
         logger.info(f"API request for document: {doc_name}")
 
-        docs_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'templates', 'docs')
+        docs_dir = DOCS_DIR
 
         if '/' in doc_name:
             parts = doc_name.split('/')
@@ -99,6 +127,59 @@ def api_get_doc(doc_name):
         logger.error(f"Error in api_get_doc for {doc_name}: {e}")
         return jsonify({'error': str(e)}), 500
 
+@docs_bp.route('/api/docs/<path:doc_name>/toc')
+def api_get_doc_toc(doc_name):
+    doc_name = sanitize_filename(urllib.parse.unquote(doc_name))
+    md_path = os.path.join(DOCS_DIR, *doc_name.split('/')) + '.md'
+    if not is_safe_path(md_path, DOCS_DIR) or not os.path.exists(md_path):
+        abort(404)
+
+    try:
+        try:
+            rendered = render_markdown_file(md_path)
+        except RenderBudgetExceeded as e:
+            rendered = render_degraded_document(md_path, e)
+    except Exception as e:
+        logger.error(f"Error building table of contents for {doc_name}: {e}")
+        return jsonify({'error': 'Failed to build table of contents'}), 500
+
+    response = jsonify({
+        'name': doc_name,
+        'title': rendered.title or doc_name.split('/')[-1].replace('_', ' ').title(),
+        'headings': rendered.headings,
+    })
+    response.headers['Cache-Control'] = 'public, max-age=60, stale-while-revalidate=300'
+    return response
+
+@docs_bp.route('/api/debug/render-stats')
+def api_render_stats():
+    if not DEBUG_STATS_ENABLED:
+        abort(404)
+    return jsonify({
+        'timings': timing_store.snapshot(),
+        'markdown_pools': get_markdown_pool_stats(),
+        'block_cache': block_cache.stats(),
+        'render_cache': render_cache.stats(),
+        'render_workers': render_workers.stats(),
+        'budget_offenders': get_budget_offenders(),
+        'slow_renders': slow_render_log.stats(),
+        'document_index': document_index.stats(),
+        'cross_references': get_reference_index().stats(),
+    })
+
+@docs_bp.route('/api/debug/slow-renders')
+def api_slow_renders():
+    if not DEBUG_STATS_ENABLED:
+        abort(404)
+    entries = slow_render_log.entries()
+    path = request.args.get('path')
+    if path:
+        entries = [entry for entry in entries if entry['path'].startswith(path)]
+    return jsonify({
+        **slow_render_log.stats(),
+        'entries': entries,
+    })
+
 @docs_bp.route('/api/analytics/popular')
 def api_popular_docs():
     try:
@@ -112,7 +193,7 @@ def api_popular_docs():
 def index():
     try:
         documents_by_section = get_documents_by_section()
-        recently_updated = [doc for doc in get_all_documents() if doc.get('recently_updated')]
+        recently_updated = get_navigation().recently_updated
         popular_docs = analytics_db.get_popular_documents(5)
 
         return render_template('index.html', 
@@ -128,41 +209,40 @@ def index():
 @docs_bp.route('/<path:template_name>')
 def serve_template(template_name):
     try:
-        template_name = urllib.parse.unquote(template_name)
-        template_name = sanitize_filename(template_name)
+        with stage('resolve'):
+            template_name = urllib.parse.unquote(template_name)
+            template_name = sanitize_filename(template_name)
 
-        logger.info(f"Serving template: {template_name}")
+            logger.info(f"Serving template: {template_name}")
 
-        is_print = request.args.get('print') == '1'
-        is_version = False
-
-        docs_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'templates', 'docs')
+            is_print = request.args.get('print') == '1'
+            is_version = False
 
-        if '/' in template_name:
-            parts = template_name.split('/')
-            file_path = os.path.join(docs_dir, *parts)
-        else:
-            file_path = os.path.join(docs_dir, template_name)
+            route = get_routes().resolve(template_name)
 
-        html_path = f"{file_path}.html"
-        md_path = f"{file_path}.md"
+        if route is None:
+            logger.warning(f"Template not found: {template_name}")
+            abort(404)
 
-        folder_path = os.path.join(docs_dir, template_name)
-        if os.path.isdir(folder_path) and not os.path.exists(md_path) and not os.path.exists(html_path):
-            first_subdoc = get_first_subdocument(template_name)
-            if first_subdoc:
-                return redirect(f"/{first_subdoc['filename']}")
-            else:
-                abort(404)
+        elif route.kind == 'folder':
+            if route.redirect:
+                return redirect(f"/{route.redirect}")
+            abort(404)
 
-        if os.path.exists(html_path) and is_safe_path(html_path, docs_dir):
+        elif route.kind == 'html':
             return render_template(f"docs/{template_name}.html")
 
-        elif os.path.exists(md_path) and is_safe_path(md_path, docs_dir):
+        else:
+            md_path = route.path
             try:
-                file_stat = os.stat(md_path)
+                # With watchdog running, an edit in place rescans the file's
+                # directory, so the route's stat is current. The mtime polling
+                # only sees files added, removed or renamed, so without it the
+                # file is stat'ed to catch in-place edits.
+                file_stat = route.stat() if document_index.watching else os.stat(md_path)
+                sidebar = get_sidebar()
                 etag_value = hashlib.sha1(
-                    f"{md_path}:{file_stat.st_mtime_ns}:{file_stat.st_size}:{int(is_print)}".encode("utf-8")
+                    f"{md_path}:{file_stat.st_mtime_ns}:{file_stat.st_size}:{int(is_print)}:{sidebar.digest}".encode("utf-8")
                 ).hexdigest()
                 etag = f"\"{etag_value}\""
                 if request.headers.get("If-None-Match") == etag and not is_print:
@@ -172,58 +252,73 @@ def serve_template(template_name):
                     response.headers["Last-Modified"] = formatdate(file_stat.st_mtime, usegmt=True)
                     return response
 
-                raw_title, description, safe_html = render_markdown_file(md_path)
+                with stage('render'):
+                    try:
+                        raw_title, description, safe_html, features, headings = render_markdown_file(md_path, file_stat)
+                        degraded = False
+                    except RenderBudgetExceeded as e:
+                        raw_title, description, safe_html, features, headings = render_degraded_document(md_path, e)
+                        degraded = True
                 title = raw_title or template_name.split('/')[-1].replace('_', ' ').title()
 
                 template = 'print.html' if is_print else 'markdown_base.html'
 
-                breadcrumbs = generate_breadcrumbs(template_name)
-
-                documents_by_category = get_documents_by_section()
-                subdocuments = get_subdocuments(template_name)
-                prev_doc, next_doc = get_sibling_navigation(template_name)
-
-                git_history = get_template_history(template_name)
-                contributors = get_document_contributors(template_name)
-                author = get_document_author(template_name)
-                recently_updated = is_recently_updated(template_name)
-
-                response = render_template(
-                    template, 
-                    content=Markup(safe_html), 
-                    title=title,
-                    description=description,
-                    doc_name=template_name,
-                    versions=git_history,
-                    contributors=contributors,
-                    author=author,
-                    recently_updated=recently_updated,
-                    is_print=is_print,
-                    is_version=is_version,
-                    github_repo=GITHUB_REPO,
-                    github_edit_url=f"{SITE_CONFIG['github_edit_base']}/{template_name}.md",
-                    documents_by_category=documents_by_category,
-                    subdocuments=subdocuments,
-                    prev_doc=prev_doc,
-                    next_doc=next_doc,
-                    breadcrumbs=breadcrumbs,
-                    get_subdocuments=get_subdocuments
-                )
-
-                if not is_print:
+                with stage('nav'):
+                    breadcrumbs = generate_breadcrumbs(template_name)
+
+                    subdocuments = get_subdocuments(template_name)
+                    prev_doc, next_doc = get_sibling_navigation(template_name)
+
+                with stage('history'):
+                    git_history = get_template_history(template_name)
+                    contributors = get_document_contributors(template_name)
+                    author = get_document_author(template_name)
+                    recently_updated = is_recently_updated(template_name)
+
+                with stage('template'):
+                    response = render_template(
+                        template, 
+                        content=Markup(safe_html), 
+                        features=sorted(features),
+                        headings=headings,
+                        title=title,
+                        description=description,
+                        doc_name=template_name,
+                        versions=git_history,
+                        contributors=contributors,
+                        author=author,
+                        recently_updated=recently_updated,
+                        is_print=is_print,
+                        is_version=is_version,
+                        github_repo=GITHUB_REPO,
+                        github_edit_url=f"{SITE_CONFIG['github_edit_base']}/{template_name}.md",
+                        sidebar=sidebar.render(template_name),
+                        subdocuments=subdocuments,
+                        prev_doc=prev_doc,
+                        next_doc=next_doc,
+                        breadcrumbs=breadcrumbs,
+                        get_subdocuments=get_subdocuments
+                    )
+
+                if degraded:
+                    response = Response(response)
+                    response.headers["Cache-Control"] = "no-store"
+                elif not is_print:
                     response = Response(response)
                     response.headers["ETag"] = etag
                     response.headers["Cache-Control"] = "public, max-age=60, stale-while-revalidate=300"
                     response.headers["Last-Modified"] = formatdate(file_stat.st_mtime, usegmt=True)
                 return response
 
+            except FileNotFoundError:
+                # Deleted since the route table was built.
+                abort(404)
             except Exception as e:
                 logger.error(f"Error processing markdown for {template_name}: {e}")
                 abort(500)
-        else:
-            logger.warning(f"Template not found: {template_name}")
-            abort(404)
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error serving template {template_name}: {e}")
         abort(500)
@@ -249,8 +344,7 @@ def view_version(template_name, commit_hash):
         title = extract_title_from_markdown(md_content) or template_name.split('/')[-1].replace('_', ' ').title()
         description = extract_description_from_markdown(md_content)
 
-        safe_html = convert_markdown_to_html(md_content)
-        safe_html = remove_first_h1(safe_html)
+        safe_html = convert_markdown_to_html(md_content, drop_first_h1=True, source=f"{template_name}.md@{commit_hash}")
 
         git_history = get_template_history(template_name)
         contributors = get_document_contributors(template_name)
@@ -293,13 +387,10 @@ def view_version(template_name, commit_hash):
 @docs_bp.route('/docs')
 def docs_redirect():
     try:
-        all_docs = get_all_documents()
-        real_docs = [doc for doc in all_docs if not doc.get('is_virtual', False)]
-        sorted_docs = sorted(real_docs, key=lambda d: (d.get('section_order', 999), d.get('order', 999), d['filename']))
-        
-        if sorted_docs:
-            first_doc_filename = sorted_docs[0]['filename']
-            return redirect(url_for('docs.serve_template', template_name=first_doc_filename))
+        first_doc = get_navigation().first_document
+
+        if first_doc:
+            return redirect(url_for('docs.serve_template', template_name=first_doc['filename']))
         else:
             return redirect(url_for('docs.index'))
             
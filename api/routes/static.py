@@ -1,4 +1,6 @@
-from flask import Blueprint, send_from_directory, abort
+from flask import Blueprint, Response, send_from_directory, abort
+from api.utils.syntax_highlight import get_highlight_css, get_syntax_highlight_mode
+from api.utils.embed_store import embed_store
 import os
 
 static_bp = Blueprint('static', __name__)
@@ -10,6 +12,25 @@ def serve_static(filename):
     response.headers['Cache-Control'] = 'public, max-age=86400'  
     return response
 
+@static_bp.route('/highlight.css')
+def highlight_css():
+    if get_syntax_highlight_mode() != 'server':
+        abort(404)
+    response = Response(get_highlight_css(), mimetype='text/css')
+    response.headers['Cache-Control'] = 'public, max-age=86400'
+    return response
+
+@static_bp.route('/embed/<key>')
+def embed_payload(key):
+    data = embed_store.get(key)
+    if data is None:
+        abort(404)
+    response = Response(data, mimetype='text/plain')
+    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    response.headers['ETag'] = f'"{key}"'
+    response.headers['X-Content-Type-Options'] = 'nosniff'
+    return response
+
 @static_bp.route('/favicon.ico')
 def favicon():
     static_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'static')
@@ -4,6 +4,12 @@ function mdocInitDesmosGraphs() {
         return;
     }
 
+    const pendingEmbeds = Array.from(desmosElements).filter((el) => el.dataset.embed && !el.hasAttribute('data-graph-config'));
+    if (pendingEmbeds.length > 0 && window.mdocResolveEmbeds) {
+        window.mdocResolveEmbeds(pendingEmbeds, 'data-graph-config').then(mdocInitDesmosGraphs);
+        return;
+    }
+
     if (window.Desmos) {
         initializeDesmosGraphs(desmosElements);
         return;
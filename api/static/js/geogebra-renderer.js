@@ -4,6 +4,12 @@ function mdocInitGeoGebraApplets() {
         return;
     }
 
+    const pendingEmbeds = Array.from(geogebraElements).filter((el) => el.dataset.embed && !el.hasAttribute('data-geogebra-config'));
+    if (pendingEmbeds.length > 0 && window.mdocResolveEmbeds) {
+        window.mdocResolveEmbeds(pendingEmbeds, 'data-geogebra-config').then(mdocInitGeoGebraApplets);
+        return;
+    }
+
     if (window.GGBApplet) {
         initializeGeoGebraApplets(geogebraElements);
         return;
@@ -4,6 +4,12 @@ function mdocInitGlslCanvases() {
         return;
     }
 
+    const pendingEmbeds = Array.from(glslElements).filter((el) => el.dataset.embed && !el.hasAttribute('data-fragment-shader'));
+    if (pendingEmbeds.length > 0 && window.mdocResolveEmbeds) {
+        window.mdocResolveEmbeds(pendingEmbeds, 'data-fragment-shader').then(mdocInitGlslCanvases);
+        return;
+    }
+
     if (window.GlslCanvas) {
         initializeGlslCanvases(glslElements);
         return;
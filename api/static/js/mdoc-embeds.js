@@ -0,0 +1,42 @@
+(() => {
+  // Embeds rendered with EMBED_STORE_ENABLED carry data-embed="<hash>"
+  // instead of an inline base64 payload. The payload is fetched once per
+  // hash (and cached by the browser for good) and written back into the
+  // attribute each renderer already reads.
+  const payloads = new Map();
+
+  function fetchPayload(hash) {
+    if (!payloads.has(hash)) {
+      const request = fetch(`/embed/${encodeURIComponent(hash)}`)
+        .then((response) => {
+          if (!response.ok) throw new Error(`HTTP ${response.status}`);
+          return response.arrayBuffer();
+        })
+        .then((buffer) => {
+          let binary = "";
+          const bytes = new Uint8Array(buffer);
+          for (let i = 0; i < bytes.length; i += 0x8000) {
+            binary += String.fromCharCode.apply(null, bytes.subarray(i, i + 0x8000));
+          }
+          return btoa(binary);
+        });
+      request.catch(() => payloads.delete(hash));
+      payloads.set(hash, request);
+    }
+    return payloads.get(hash);
+  }
+
+  window.mdocResolveEmbeds = (elements, attribute) =>
+    Promise.all(
+      Array.from(elements)
+        .filter((el) => el.dataset.embed && !el.hasAttribute(attribute))
+        .map((el) =>
+          fetchPayload(el.dataset.embed)
+            .then((encoded) => el.setAttribute(attribute, encoded))
+            .catch((error) => {
+              console.error(`Failed to load embed ${el.dataset.embed}:`, error);
+              el.setAttribute(attribute, "");
+            })
+        )
+    );
+})();
@@ -39,6 +39,92 @@
     if (link) link.classList.add("active");
   }
 
+  const navSections = {
+    observer: null,
+    loading: new Map(),
+  };
+
+  function renderNavSection(list, documents) {
+    list.replaceChildren(
+      ...documents.map((entry) => {
+        const item = document.createElement("li");
+        const link = document.createElement("a");
+        link.setAttribute("href", `/${entry.filename}`);
+        link.className = "nav-link";
+        link.textContent = entry.title;
+        item.appendChild(link);
+        return item;
+      }),
+    );
+    delete list.dataset.navPending;
+  }
+
+  function loadNavSection(list) {
+    // With SIDEBAR_MODE=lazy only the page's own section comes with it.
+    if (list.dataset.navPending !== "1") return Promise.resolve();
+    const name = list.dataset.navSection;
+    if (!navSections.loading.has(name)) {
+      const request = fetch(`/api/nav?section=${encodeURIComponent(name)}`)
+        .then((res) => (res.ok ? res.json() : Promise.reject(new Error(res.statusText))))
+        .then((data) => {
+          renderNavSection(list, data.documents);
+          updateActiveNav(window.location.pathname);
+        })
+        .catch(() => {})
+        .finally(() => navSections.loading.delete(name));
+      navSections.loading.set(name, request);
+    }
+    return navSections.loading.get(name);
+  }
+
+  function loadPendingNavSections() {
+    return Promise.all([...document.querySelectorAll("ul[data-nav-pending]")].map(loadNavSection));
+  }
+
+  function adoptNavSections(doc) {
+    // A fetched page brings its own section expanded; no request needed.
+    doc.querySelectorAll("ul[data-nav-section]:not([data-nav-pending])").forEach((incoming) => {
+      const list = document.querySelector(
+        `ul[data-nav-section="${CSS.escape(incoming.dataset.navSection)}"][data-nav-pending]`,
+      );
+      if (!list) return;
+      list.innerHTML = incoming.innerHTML;
+      delete list.dataset.navPending;
+      navSections.observer?.unobserve(list);
+    });
+  }
+
+  function initLazyNav() {
+    const pending = document.querySelectorAll("ul[data-nav-pending]");
+    if (!pending.length) return;
+
+    if ("IntersectionObserver" in window) {
+      navSections.observer = new IntersectionObserver(
+        (entries) => {
+          entries.forEach((entry) => {
+            if (!entry.isIntersecting) return;
+            navSections.observer.unobserve(entry.target);
+            loadNavSection(entry.target);
+          });
+        },
+        { root: document.getElementById("sidebar"), rootMargin: "200px 0px" },
+      );
+      pending.forEach((list) => navSections.observer.observe(list));
+    } else {
+      loadPendingNavSections();
+    }
+
+    // The sidebar search filters the links in the page, so it needs them all.
+    const searchInput = document.getElementById("search-input");
+    searchInput?.addEventListener(
+      "focus",
+      () => {
+        loadPendingNavSections().then(() => searchInput.dispatchEvent(new Event("keyup")));
+      },
+      { once: true },
+    );
+  }
+
   function syncMetaTag(doc, name) {
     const incoming = doc.querySelector(`meta[name="${CSS.escape(name)}"]`);
     if (!incoming) return;
@@ -86,12 +172,15 @@
       }
 
       main.innerHTML = newMain.innerHTML;
+      if (newMain.dataset.mdocFeatures) main.dataset.mdocFeatures = newMain.dataset.mdocFeatures;
+      else delete main.dataset.mdocFeatures;
       document.title = doc.title || document.title;
       syncMetaTag(doc, "description");
 
       if (replaceState) history.replaceState({}, "", targetUrl.href);
       else history.pushState({}, "", targetUrl.href);
 
+      adoptNavSections(doc);
       updateActiveNav(targetUrl.pathname);
 
       window.mdocInitPage?.();
@@ -129,4 +218,6 @@
   window.addEventListener("popstate", () => {
     navigateTo(new URL(window.location.href), { replaceState: true });
   });
+
+  initLazyNav();
 })();
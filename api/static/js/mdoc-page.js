@@ -52,13 +52,14 @@
   }
 
   function enhanceCodeBlocks() {
-    if (!window.hljs) return;
-
+    // Server-highlighted pages ship without hljs and only need the chrome.
     document.querySelectorAll("pre code").forEach((codeEl) => {
       const pre = codeEl.parentElement;
       if (!pre) return;
 
-      window.hljs.highlightElement(codeEl);
+      if (window.hljs && !codeEl.classList.contains("mdoc-hl")) {
+        window.hljs.highlightElement(codeEl);
+      }
 
       if (pre.closest(".mdoc-hint")) return;
 
@@ -182,19 +183,32 @@
       window.__mdocTocObserver = null;
     }
 
-    const headings = document.querySelectorAll(".md-content h2, .md-content h3");
-    headings.forEach((heading) => {
-      if (!heading.id) {
-        heading.id = heading.innerText.toLowerCase().replace(/[^a-z0-9]+/g, "-");
-      }
+    // Rendered pages ship their outline; anything else is read off the DOM.
+    const tocData = document.getElementById("mdoc-toc-data");
+    let entries;
+    if (tocData) {
+      entries = JSON.parse(tocData.textContent || "[]")
+        .filter((item) => item.level === 2 || item.level === 3)
+        .map((item) => ({ element: document.getElementById(item.id), text: item.text, level: item.level }))
+        .filter((entry) => entry.element);
+    } else {
+      entries = Array.from(document.querySelectorAll(".md-content h2, .md-content h3")).map((heading) => {
+        if (!heading.id) {
+          heading.id = heading.innerText.toLowerCase().replace(/[^a-z0-9]+/g, "-");
+        }
+        return { element: heading, text: heading.innerText, level: heading.tagName === "H3" ? 3 : 2 };
+      });
+    }
+    const headings = entries.map((entry) => entry.element);
 
+    entries.forEach((entry) => {
       const li = document.createElement("li");
       const a = document.createElement("a");
-      a.href = "#" + heading.id;
+      a.href = "#" + entry.element.id;
       a.className = "toc-link";
-      a.textContent = heading.innerText;
+      a.textContent = entry.text;
 
-      if (heading.tagName === "H3") a.style.paddingLeft = "35px";
+      if (entry.level === 3) a.style.paddingLeft = "35px";
 
       li.appendChild(a);
       tocList.appendChild(li);
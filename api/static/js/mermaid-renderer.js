@@ -4,6 +4,12 @@ function mdocInitMermaidDiagrams() {
         return;
     }
 
+    const pendingEmbeds = Array.from(mermaidElements).filter((el) => el.dataset.embed && !el.hasAttribute('data-diagram'));
+    if (pendingEmbeds.length > 0 && window.mdocResolveEmbeds) {
+        window.mdocResolveEmbeds(pendingEmbeds, 'data-diagram').then(mdocInitMermaidDiagrams);
+        return;
+    }
+
     if (window.mermaid) {
         initializeMermaidDiagrams(mermaidElements);
         return;
@@ -152,6 +152,12 @@ function loadP5LibraryAndInitialize() {
         return;
     }
 
+    const pendingEmbeds = Array.from(p5jsPlaceholders).filter((el) => el.dataset.embed && !el.hasAttribute('data-sketch-code'));
+    if (pendingEmbeds.length > 0 && window.mdocResolveEmbeds) {
+        window.mdocResolveEmbeds(pendingEmbeds, 'data-sketch-code').then(loadP5LibraryAndInitialize);
+        return;
+    }
+
     if (typeof p5 !== 'undefined') {
         console.log("P5.js already loaded. Initializing sketches directly.");
         initializeAllP5Sketches();
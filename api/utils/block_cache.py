@@ -0,0 +1,155 @@
+import collections
+import hashlib
+import logging
+import re
+import threading
+from markdown.util import BLOCK_LEVEL_ELEMENTS
+from api.config import BLOCK_CACHE_ENABLED, BLOCK_CACHE_MAX_ENTRIES
+
+logger = logging.getLogger(__name__)
+
+FENCE_RE = re.compile(r'^(`{3,}|~{3,})')
+HEADING_RE = re.compile(r'^#{1,6}(?:\s|$)')
+REFERENCE_RE = re.compile(r'^ {0,3}\[[^\]]+\]:', re.MULTILINE)
+HTML_BLOCK_TAG_RE = re.compile(
+    r'<(/?)(' + '|'.join(sorted(tag for tag in BLOCK_LEVEL_ELEMENTS if tag != 'hr')) + r')\b',
+    re.IGNORECASE,
+)
+
+
+def split_markdown_blocks(md_content):
+    # Returns the top-level blocks of a document (heading sections and
+    # fenced blocks), or None when the document uses something that can
+    # reach across blocks and has to be rendered in one piece.
+    if '[TOC]' in md_content or REFERENCE_RE.search(md_content):
+        return None
+
+    blocks = []
+    current = []
+    fence = None
+    inner_fence = None
+    after_fence = False
+    html_depth = collections.Counter()
+
+    def flush():
+        if any(line.strip() for line in current):
+            blocks.append('\n'.join(current))
+        current.clear()
+
+    # Blocks are only cut where the source has a blank line, so the
+    # separator between two rendered blocks is the same as in one render.
+    for line in md_content.split('\n'):
+        stripped = line.strip()
+
+        # Counted inside fences as well: tabs and hints pass their content's
+        # markup through, and an unbalanced tag there swallows what follows.
+        for closing, tag in HTML_BLOCK_TAG_RE.findall(line):
+            tag = tag.lower()
+            if not closing:
+                html_depth[tag] += 1
+            elif html_depth[tag]:
+                html_depth[tag] -= 1
+
+        if fence is not None:
+            current.append(line)
+            if inner_fence is not None:
+                if stripped == inner_fence:
+                    inner_fence = None
+                elif FENCE_RE.match(stripped):
+                    return None
+            elif stripped == fence:
+                if line[0] in ' \t':
+                    # Fenced code only closes at column 0, the custom fences
+                    # close anywhere: the two readings disagree here.
+                    return None
+                fence = None
+                after_fence = True
+            else:
+                match = FENCE_RE.match(stripped)
+                if match:
+                    # The custom fences are taken out before fenced code and
+                    # match their own markers anywhere, so only a shorter
+                    # fence nested in a longer one (```` tabs) pairs the same
+                    # way for both; anything else goes through a full render.
+                    if match.group(1)[0] != fence[0] or len(match.group(1)) >= len(fence):
+                        return None
+                    inner_fence = match.group(1)
+            continue
+
+        if after_fence and not stripped and not +html_depth:
+            flush()
+        after_fence = False
+        at_boundary = (not current or not current[-1].strip()) and not +html_depth
+
+        match = FENCE_RE.match(stripped)
+        if match:
+            if line[0] in ' \t':
+                # Custom fences open anywhere, fenced code only at column 0.
+                return None
+            fence = match.group(1)
+            if at_boundary:
+                flush()
+            current.append(line)
+            continue
+
+        if at_boundary and HEADING_RE.match(line):
+            flush()
+        current.append(line)
+
+    if +html_depth:
+        return None
+
+    flush()
+    return blocks
+
+
+class BlockCache:
+    def __init__(self, max_entries=2048, enabled=True):
+        self.max_entries = max(1, int(max_entries))
+        self.enabled = enabled
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(block, *parts):
+        digest = hashlib.sha1(block.encode('utf-8'))
+        for part in parts:
+            digest.update(b'\0')
+            digest.update(str(part).encode('utf-8'))
+        return digest.hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def set(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+
+block_cache = BlockCache(max_entries=BLOCK_CACHE_MAX_ENTRIES, enabled=BLOCK_CACHE_ENABLED)
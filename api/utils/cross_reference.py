@@ -1,21 +1,110 @@
 import re
-from api.utils.documents import get_all_documents
+import hashlib
+import logging
+import threading
+from api.utils.documents import document_index
+
+logger = logging.getLogger(__name__)
+
+REFERENCE_PATTERN = re.compile(r'\[\[([^\]]+)\]\]')
+
+class ReferenceIndex:
+    def __init__(self, documents, generation=None):
+        self.documents = documents
+        self.generation = generation
+        self.filenames = {}
+        self.titles = {}
+        self.aliases = {}
+        self.counts = {'filename': 0, 'title': 0, 'alias': 0, 'broken': 0}
+
+        digest = hashlib.sha1()
+        ambiguous = set()
+        for doc in documents:
+            filename = doc['filename']
+            title = doc['title']
+            digest.update(f"{filename}\0{title}\n".encode('utf-8'))
+
+            self.filenames[filename] = title
+            self.titles.setdefault(title.casefold(), (filename, title))
+
+            # [[1_Installation]] or [[Installation]] for "1_Getting_Started/1_Installation"
+            basename = filename.rsplit('/', 1)[-1]
+            parts = basename.split('_', 1)
+            stem = parts[1] if len(parts) > 1 and parts[0].isdigit() else basename
+            for alias in {basename.casefold(), stem.casefold(), stem.replace('_', ' ').casefold()}:
+                if alias in ambiguous:
+                    continue
+                if alias in self.aliases and self.aliases[alias][0] != filename:
+                    del self.aliases[alias]
+                    ambiguous.add(alias)
+                    continue
+                self.aliases[alias] = (filename, title)
+
+        self.digest = digest.hexdigest()
+
+    def resolve(self, ref_text):
+        title = self.filenames.get(ref_text)
+        if title is not None:
+            return ref_text, title, 'filename'
+
+        key = ref_text.casefold()
+        match = self.titles.get(key)
+        if match is not None:
+            return match + ('title',)
+
+        match = self.aliases.get(key)
+        if match is not None:
+            return match + ('alias',)
+
+        return None
+
+    def stats(self):
+        # Resolutions since this index was built, i.e. since the document
+        # list last changed.
+        return {
+            'generation': self.generation,
+            'documents': len(self.documents),
+            'titles': len(self.titles),
+            'aliases': len(self.aliases),
+            **self.counts,
+        }
+
+_reference_index = None
+_reference_index_lock = threading.Lock()
+
+def get_reference_index():
+    global _reference_index
+    generation, documents = document_index.snapshot()
+    index = _reference_index
+    if index is None or index.generation != generation:
+        with _reference_index_lock:
+            index = _reference_index
+            if index is None or index.generation != generation:
+                index = ReferenceIndex(documents, generation)
+                _reference_index = index
+    return index
 
 def process_cross_references(content):
-    documents = get_all_documents()
-    doc_titles = {doc['filename']: doc['title'] for doc in documents}
-    
+    if '[[' not in content:
+        return content
+
+    index = get_reference_index()
+
     def replace_reference(match):
         ref_text = match.group(1)
-        
-        if ref_text in doc_titles:
-            return f'<a href="/{ref_text}" class="cross-reference">{doc_titles[ref_text]}</a>'
-        
-        for filename, title in doc_titles.items():
-            if title.lower() == ref_text.lower():
-                return f'<a href="/{filename}" class="cross-reference">{title}</a>'
-        
-        return f'<span class="broken-reference">[[{ref_text}]]</span>'
-    
-    pattern = r'\[\[([^\]]+)\]\]'
-    return re.sub(pattern, replace_reference, content)
\ No newline at end of file
+        resolved = index.resolve(ref_text)
+
+        kind = resolved[2] if resolved else 'broken'
+        index.counts[kind] += 1
+
+        if resolved is None:
+            logger.debug(f"Broken cross-reference: [[{ref_text}]]")
+            return f'<span class="broken-reference">[[{ref_text}]]</span>'
+
+        filename, title, _ = resolved
+        return f'<a href="/{filename}" class="cross-reference">{title}</a>'
+
+    return REFERENCE_PATTERN.sub(replace_reference, content)
+
+def get_reference_digest():
+    return get_reference_index().digest
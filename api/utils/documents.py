@@ -1,106 +1,535 @@
 import os
-import functools
 import re
-from api.utils.github_utils import is_recently_updated
+import collections
+import json
+import hashlib
+import sys
+import tempfile
+import threading
+import time
+import logging
+from api.utils.github_utils import is_recently_modified
+from api.config import DOCS_DIR, DOCS_INDEX_CHECK_SECONDS, DOCS_MANIFEST_PATH, RENDER_CACHE_READONLY
+
+logger = logging.getLogger(__name__)
 
 SECTION_ALIASES = {
 }
 
-@functools.lru_cache(maxsize=128)
-def get_all_documents():
-    try:
-        documents = []
-        docs_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'templates', 'docs')
-        
-        if not os.path.exists(docs_dir):
-            os.makedirs(docs_dir)
-            return []
-        
-        def scan_directory(current_dir, parent_path=""):
-            for item in os.listdir(current_dir):
-                item_path = os.path.join(current_dir, item)
-                
-                if os.path.isfile(item_path):
-                    if item.endswith('.html') and item not in ['index.html', 'markdown_base.html', 'error.html', 'print.html']:
-                        filename = item.replace('.html', '')
-                        full_path = f"{parent_path}/{filename}" if parent_path else filename
-                        title = extract_clean_title(filename)
-                        section = extract_section_from_path(parent_path) if parent_path else "Documentation"
-                        
-                        if section and section not in ["Test", "Example"]:
-                            documents.append({
-                                'filename': full_path,
-                                'title': title,
-                                'section': section,
-                                'category': section,
-                                'is_subdoc': bool(parent_path),
-                                'parent': parent_path if parent_path else None,
-                                'recently_updated': is_recently_updated(full_path),
-                                'order': get_order_from_filename(filename),
-                                'section_order': get_section_order_from_path(parent_path) if parent_path else 999
-                            })
-                    elif item.endswith('.md'):
-                        filename = item.replace('.md', '')
-                        full_path = f"{parent_path}/{filename}" if parent_path else filename
-                        title = extract_clean_title(filename)
-                        section = extract_section_from_path(parent_path) if parent_path else "Documentation"
-                        
+EXCLUDED_HTML_FILES = {'index.html', 'markdown_base.html', 'error.html', 'print.html'}
+MANIFEST_VERSION = 2
+
+def _document_file(item, parent_path):
+    # (filename, excluded sections) for a file that is a document.
+    if item.endswith('.html') and item not in EXCLUDED_HTML_FILES:
+        return item.replace('.html', ''), ["Test", "Example"]
+    if item.endswith('.md'):
+        return item.replace('.md', ''), ["Meekleboss", "Test", "Example"]
+    return None, None
+
+def _read_document_file(item_path, is_markdown):
+    # Title from a "# " first line, and a hash of the content.
+    with open(item_path, 'rb') as file:
+        data = file.read()
+    title = None
+    if is_markdown:
+        try:
+            first_line = data.split(b'\n', 1)[0].decode('utf-8').strip()
+            if first_line.startswith('# '):
+                title = first_line[2:].strip()
+        except UnicodeDecodeError:
+            pass
+    return title, hashlib.sha256(data).hexdigest()[:16]
+
+class DocumentRecord:
+    # One document's metadata. Slotted and immutable, since the same records
+    # are shared by every request; section and parent are interned, so a
+    # tree of thousands of documents keeps one copy of each. Reads like the
+    # dicts it replaced (doc['title'], doc.get('parent')).
+    __slots__ = ('filename', 'title', 'section', 'is_subdoc', 'parent', 'recently_updated', 'order', 'section_order', 'is_virtual')
+
+    def __init__(self, filename, title, section, is_subdoc, parent, recently_updated, order, section_order, is_virtual=False):
+        set_field = object.__setattr__
+        set_field(self, 'filename', filename)
+        set_field(self, 'title', title)
+        set_field(self, 'section', sys.intern(section))
+        set_field(self, 'is_subdoc', is_subdoc)
+        set_field(self, 'parent', sys.intern(parent) if parent else None)
+        set_field(self, 'recently_updated', recently_updated)
+        set_field(self, 'order', order)
+        set_field(self, 'section_order', section_order)
+        set_field(self, 'is_virtual', is_virtual)
+
+    @property
+    def category(self):
+        return self.section
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    __delattr__ = __setattr__
+
+    def _values(self):
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def _replace(self, **changes):
+        values = dict(zip(self.__slots__, self._values()), **changes)
+        return DocumentRecord(**values)
+
+    def __getitem__(self, key):
+        if key == 'category' or key in self.__slots__:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def as_dict(self):
+        data = {
+            'filename': self.filename,
+            'title': self.title,
+            'section': self.section,
+            'category': self.section,
+            'is_subdoc': self.is_subdoc,
+            'parent': self.parent,
+            'recently_updated': self.recently_updated,
+            'order': self.order,
+            'section_order': self.section_order,
+        }
+        if self.is_virtual:
+            data['is_virtual'] = True
+        return data
+
+    def __eq__(self, other):
+        if not isinstance(other, DocumentRecord):
+            return NotImplemented
+        return self._values() == other._values()
+
+    def __hash__(self):
+        return hash(self._values())
+
+    def __reduce__(self):
+        return DocumentRecord, self._values()
+
+    def __repr__(self):
+        return f"DocumentRecord({self.filename!r}, section={self.section!r})"
+
+class DocumentColumns:
+    # The same records as parallel tuples, one per field, for whole-list
+    # work: a filter or a sort reads one or two columns instead of looking
+    # up attributes on every record.
+    __slots__ = ('records',) + DocumentRecord.__slots__
+
+    def __init__(self, records):
+        records = tuple(records)
+        object.__setattr__(self, 'records', records)
+        columns = list(zip(*(record._values() for record in records))) or [()] * len(DocumentRecord.__slots__)
+        for name, column in zip(DocumentRecord.__slots__, columns):
+            object.__setattr__(self, name, tuple(column))
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __len__(self):
+        return len(self.records)
+
+    def where(self, column, value=True):
+        return [record for record, field in zip(self.records, getattr(self, column)) if field == value]
+
+    def order_by(self, *columns):
+        keys = list(zip(*(getattr(self, column) for column in columns)))
+        return [self.records[i] for i in sorted(range(len(self.records)), key=keys.__getitem__)]
+
+def _build_document(filename, parent_path, title, recently_updated=False):
+    return DocumentRecord(
+        f"{parent_path}/{filename}" if parent_path else filename,
+        title or extract_clean_title(filename),
+        extract_section_from_path(parent_path) if parent_path else "Documentation",
+        bool(parent_path),
+        parent_path if parent_path else None,
+        recently_updated,
+        get_order_from_filename(filename),
+        get_section_order_from_path(parent_path) if parent_path else 999,
+    )
+
+def _mark_recently_updated(entries):
+    # A page counts as updated when its .md or its .html is.
+    mtimes = {}
+    for entry in entries:
+        if entry[0] == 'doc':
+            name = entry[1].filename
+            mtimes[name] = max(mtimes.get(name, 0), entry[2]['mtime_ns'])
+    for i, entry in enumerate(entries):
+        if entry[0] == 'doc':
+            recently_updated = is_recently_modified(mtimes[entry[1].filename] / 1e9)
+            if recently_updated != entry[1].recently_updated:
+                entries[i] = ('doc', entry[1]._replace(recently_updated=recently_updated), entry[2])
+
+class DocumentIndex:
+    # The document list, rebuilt only where the tree changed. Every
+    # directory keeps the mtime it was scanned at: adding, removing or
+    # renaming a file changes it, and only that directory is read again.
+    # generation goes up whenever the list changes, so other caches can be
+    # keyed on it.
+    def __init__(self, root, check_interval=2.0, manifest_path=None, readonly=False):
+        self.root = root
+        self.check_interval = check_interval
+        self.manifest_path = manifest_path
+        self.readonly = readonly
+        self.full_scans = 0
+        self.directory_scans = 0
+        self.files_read = 0
+        self.manifest_loaded = False
+        self.manifest_writes = 0
+        self._directories = {}
+        self._snapshot = (0, None)
+        self._dirty = set()
+        self._changed = False
+        self._last_check = 0.0
+        self._observer = None
+        self._lock = threading.RLock()
+
+    @property
+    def generation(self):
+        return self._snapshot[0]
+
+    @property
+    def _documents(self):
+        return self._snapshot[1]
+
+    def _path(self, rel_dir):
+        return os.path.join(self.root, *rel_dir.split('/')) if rel_dir else self.root
+
+    def _scan_directory(self, rel_dir, previous=None):
+        current_dir = self._path(rel_dir)
+        # Taken before listing, so a change made during the scan is picked
+        # up by the next check rather than lost.
+        mtime_ns = os.stat(current_dir).st_mtime_ns
+        # Files whose size and mtime did not change are not read again.
+        known = {entry[2]['file']: entry for entry in (previous or {}).get('entries', ()) if entry[0] == 'doc'}
+        entries = []
+        with os.scandir(current_dir) as it:
+            for item in it:
+                if item.is_file():
+                    if not item.name.endswith(('.md', '.html')):
+                        continue
+                    stat = item.stat()
+                    filename, excluded_sections = _document_file(item.name, rel_dir)
+                    section = extract_section_from_path(rel_dir) if rel_dir else "Documentation"
+                    if filename is None or not section or section in excluded_sections:
+                        # Not listed, but still served at its URL.
+                        entries.append(('file', None, {'file': item.name, 'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size}))
+                        continue
+                    old = known.get(item.name)
+                    if old is not None and old[2]['mtime_ns'] == stat.st_mtime_ns and old[2]['size'] == stat.st_size:
+                        title, content_hash = old[2]['title'], old[2]['hash']
+                    else:
                         try:
-                            with open(item_path, 'r', encoding='utf-8') as file:
-                                first_line = file.readline().strip()
-                                if first_line.startswith('# '):
-                                    title = first_line[2:].strip()
-                        except Exception:
-                            pass
-                        
-                        if section and section not in ["Meekleboss", "Test", "Example"]:
-                            documents.append({
-                                'filename': full_path,
-                                'title': title,
-                                'section': section,
-                                'category': section,
-                                'is_subdoc': bool(parent_path),
-                                'parent': parent_path if parent_path else None,
-                                'recently_updated': is_recently_updated(full_path),
-                                'order': get_order_from_filename(filename),
-                                'section_order': get_section_order_from_path(parent_path) if parent_path else 999
-                            })
-                
-                elif os.path.isdir(item_path):
-                    new_parent = f"{parent_path}/{item}" if parent_path else item
-                    scan_directory(item_path, new_parent)
-        
-        scan_directory(docs_dir)
-        
+                            title, content_hash = _read_document_file(item.path, item.name.endswith('.md'))
+                        except OSError:
+                            title, content_hash = None, None
+                        self.files_read += 1
+                    meta = {
+                        'file': item.name,
+                        'title': title,
+                        'mtime_ns': stat.st_mtime_ns,
+                        'size': stat.st_size,
+                        'hash': content_hash,
+                    }
+                    entries.append(('doc', _build_document(filename, rel_dir, title), meta))
+                elif item.is_dir():
+                    entries.append(('dir', f"{rel_dir}/{item.name}" if rel_dir else item.name))
+        _mark_recently_updated(entries)
+        self.directory_scans += 1
+        return {'mtime_ns': mtime_ns, 'entries': entries}
+
+    def _rescan(self, rel_dir):
+        old = self._directories.get(rel_dir)
+        entry = self._scan_directory(rel_dir, old)
+        self._directories[rel_dir] = entry
+        self._changed = True
+
+        subdirs = {value[1] for value in entry['entries'] if value[0] == 'dir'}
+        if old is not None:
+            for value in old['entries']:
+                if value[0] == 'dir' and value[1] not in subdirs:
+                    self._drop(value[1])
+        for subdir in subdirs:
+            if subdir not in self._directories:
+                self._rescan(subdir)
+
+    def _drop(self, rel_dir):
+        prefix = rel_dir + '/'
+        for key in [key for key in self._directories if key == rel_dir or key.startswith(prefix)]:
+            del self._directories[key]
+
+    def _changed_directories(self):
+        changed = set(self._dirty)
+        self._dirty.clear()
+        if self._observer is None:
+            for rel_dir, entry in self._directories.items():
+                try:
+                    if os.stat(self._path(rel_dir)).st_mtime_ns != entry['mtime_ns']:
+                        changed.add(rel_dir)
+                except OSError:
+                    # Gone: its parent has changed too and drops it.
+                    continue
+        # Parents first; a parent's rescan may already have dropped a child.
+        return sorted(changed, key=lambda rel_dir: (rel_dir.count('/') if rel_dir else -1, rel_dir))
+
+    def _collect(self):
+        documents = []
+
+        def walk(rel_dir):
+            for entry in self._directories[rel_dir]['entries']:
+                if entry[0] == 'doc':
+                    documents.append(entry[1])
+                elif entry[1] in self._directories:
+                    walk(entry[1])
+
+        walk('')
+
         folder_names = set()
         for doc in documents:
-            if doc['is_subdoc'] and doc['parent']:
-                folder_names.add(doc['parent'])
-        
-        existing_parents = set(doc['filename'] for doc in documents if not doc['is_subdoc'])
-        
+            if doc.is_subdoc and doc.parent:
+                folder_names.add(doc.parent)
+
+        existing_parents = set(doc.filename for doc in documents if not doc.is_subdoc)
+
         for folder_name in folder_names:
             if folder_name not in existing_parents:
                 section = extract_section_from_path(folder_name)
                 if section and section not in ["Meekleboss", "Test", "Example"]:
-                    documents.append({
-                        'filename': folder_name,
-                        'title': extract_clean_title(folder_name.split('/')[-1]),
-                        'section': section,
-                        'category': section,
-                        'is_subdoc': False,
-                        'parent': None,
-                        'recently_updated': False,
-                        'order': 999,
-                        'section_order': get_section_order_from_path(folder_name),
-                        'is_virtual': True
-                    })
-        
-        return sorted(documents, key=lambda x: (x['section_order'], x['section'], x['order'], x['title']))
-        
-    except Exception as e:
-        print(f"Error getting documents: {str(e)}")
-        return []
+                    documents.append(DocumentRecord(
+                        folder_name,
+                        extract_clean_title(folder_name.split('/')[-1]),
+                        section,
+                        False,
+                        None,
+                        False,
+                        999,
+                        get_section_order_from_path(folder_name),
+                        is_virtual=True,
+                    ))
+
+        return tuple(DocumentColumns(documents).order_by('section_order', 'section', 'order', 'title'))
+
+    def _publish(self, documents):
+        # One tuple, so readers never see a list with another generation.
+        # Any rescan counts as a change: unlisted files are still routes.
+        if self._changed or documents != self._documents:
+            self._snapshot = (self.generation + 1, documents)
+        if self._changed:
+            self._changed = False
+            self.write_manifest()
+
+    def _manifest_root(self):
+        # Relative to the manifest, so a deployment can move both together.
+        return os.path.relpath(os.path.abspath(self.root), os.path.dirname(os.path.abspath(self.manifest_path)))
+
+    def load_manifest(self):
+        # Directory state from an earlier process: a cold start then costs
+        # one read plus a stat per directory, instead of walking the tree.
+        if not self.manifest_path:
+            return False
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable document manifest: {e}")
+            return False
+        if manifest.get('version') != MANIFEST_VERSION or manifest.get('root') != self._manifest_root():
+            return False
+
+        directories = {}
+        for rel_dir, stored in manifest.get('directories', {}).items():
+            entries = []
+            for entry in stored['entries']:
+                if entry[0] == 'dir':
+                    entries.append(('dir', entry[1]))
+                    continue
+                meta = entry[1]
+                if entry[0] == 'file':
+                    entries.append(('file', None, meta))
+                    continue
+                filename, _ = _document_file(meta['file'], rel_dir)
+                entries.append(('doc', _build_document(filename, rel_dir, meta['title']), meta))
+            _mark_recently_updated(entries)
+            directories[rel_dir] = {'mtime_ns': stored['mtime_ns'], 'entries': entries}
+        if '' not in directories:
+            return False
+
+        with self._lock:
+            self._directories = directories
+            self.manifest_loaded = True
+        return True
+
+    def write_manifest(self):
+        if not self.manifest_path or self.readonly:
+            return False
+        manifest = {
+            'version': MANIFEST_VERSION,
+            'root': self._manifest_root(),
+            'directories': {
+                rel_dir: {
+                    'mtime_ns': entry['mtime_ns'],
+                    'entries': [[value[0], value[1] if value[0] == 'dir' else value[2]] for value in entry['entries']],
+                }
+                for rel_dir, entry in self._directories.items()
+            },
+        }
+        directory = os.path.dirname(os.path.abspath(self.manifest_path))
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-', suffix='.json')
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(manifest, f, separators=(',', ':'))
+                os.replace(tmp_path, self.manifest_path)
+            except BaseException:
+                try:
+                    os.unlink(tmp_path)
+                except OSError:
+                    pass
+                raise
+        except OSError as e:
+            logger.warning(f"Document manifest write failed, switching to read-only: {e}")
+            self.readonly = True
+            return False
+        self.manifest_writes += 1
+        return True
+
+    def route_files(self):
+        # Every servable file by URL path and extension, and every folder.
+        with self._lock:
+            files = {}
+            folders = {}
+            for rel_dir, entry in self._directories.items():
+                directory = self._path(rel_dir)
+                if rel_dir:
+                    folders[rel_dir] = directory
+                for value in entry['entries']:
+                    if value[0] == 'dir':
+                        continue
+                    meta = value[2]
+                    stem, extension = os.path.splitext(meta['file'])
+                    name = f"{rel_dir}/{stem}" if rel_dir else stem
+                    files.setdefault(name, {})[extension] = (
+                        os.path.join(directory, meta['file']), meta['mtime_ns'], meta['size'],
+                    )
+            return files, folders
+
+    def rescan(self):
+        with self._lock:
+            self._last_check = time.monotonic()
+            self._dirty.clear()
+            self._directories.clear()
+            try:
+                if not os.path.exists(self.root):
+                    os.makedirs(self.root)
+                    self._publish(())
+                    return self._documents
+                self._rescan('')
+                self.full_scans += 1
+                self._publish(self._collect())
+            except Exception as e:
+                print(f"Error getting documents: {str(e)}")
+                self._directories.clear()
+                if self._documents is None:
+                    self._publish(())
+            return self._documents
+
+    def refresh(self):
+        with self._lock:
+            if '' not in self._directories and (self._documents is not None or not self.load_manifest()):
+                return self.rescan()
+            self._last_check = time.monotonic()
+            changed = self._changed_directories()
+            if not changed and self._documents is not None:
+                return self._documents
+            try:
+                for rel_dir in changed:
+                    if rel_dir in self._directories:
+                        self._rescan(rel_dir)
+                self._publish(self._collect())
+            except Exception as e:
+                print(f"Error updating documents: {str(e)}")
+                return self.rescan()
+            return self._documents
+
+    def documents(self):
+        if self._documents is None or self._dirty or (
+            self._observer is None and time.monotonic() - self._last_check >= self.check_interval
+        ):
+            return self.refresh()
+        return self._documents
+
+    @property
+    def watching(self):
+        return self._observer is not None
+
+    def snapshot(self):
+        self.documents()
+        return self._snapshot
+
+    def watch(self):
+        # Optional: with watchdog installed, file system events mark
+        # directories for a rescan and the mtime polling stops. Unlike the
+        # polling, this also sees a document edited in place.
+        try:
+            from watchdog.observers import Observer
+            from watchdog.events import FileSystemEventHandler
+        except ImportError:
+            logger.warning("DOCS_INDEX_WATCH needs the watchdog package, checking directory mtimes instead")
+            return False
+
+        index = self
+
+        class Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                for path in (event.src_path, getattr(event, 'dest_path', None)):
+                    if not path:
+                        continue
+                    parent = os.path.relpath(os.path.dirname(path), index.root)
+                    index._dirty.add('' if parent == '.' else parent.replace(os.sep, '/'))
+
+        with self._lock:
+            if self._observer is None:
+                observer = Observer()
+                observer.schedule(Handler(), self.root, recursive=True)
+                observer.daemon = True
+                observer.start()
+                self._observer = observer
+        return True
+
+    def stats(self):
+        return {
+            'generation': self.generation,
+            'documents': len(self._documents or []),
+            'directories': len(self._directories),
+            'full_scans': self.full_scans,
+            'directory_scans': self.directory_scans,
+            'files_read': self.files_read,
+            'manifest': self.manifest_path or None,
+            'manifest_loaded': self.manifest_loaded,
+            'manifest_writes': self.manifest_writes,
+            'manifest_readonly': self.readonly,
+            'watching': self.watching,
+            'check_interval_s': self.check_interval,
+        }
+
+document_index = DocumentIndex(DOCS_DIR, DOCS_INDEX_CHECK_SECONDS, DOCS_MANIFEST_PATH, readonly=RENDER_CACHE_READONLY)
+
+def get_all_documents():
+    return document_index.documents()
+
+def get_documents_generation():
+    return document_index.snapshot()[0]
 
 def extract_clean_title(filename):
     parts = filename.split('_', 1)
@@ -145,21 +574,64 @@ def get_order_from_filename(filename):
         return int(parts[0])
     return 999
 
+class NavigationTree:
+    # Everything the navigation asks of the document list, worked out once
+    # per index generation: sections, each folder's ordered children, and
+    # every document's previous and next sibling.
+    def __init__(self, documents, generation=None):
+        self.generation = generation
+        self.columns = DocumentColumns(documents)
+        self.children = {}
+        self.siblings = {}
+        self.sections = {}
+
+        for doc in self.columns.order_by('order'):
+            self.children.setdefault(doc.parent, []).append(doc)
+        for parent, children in self.children.items():
+            self.children[parent] = children = tuple(children)
+            if parent is None:
+                continue
+            for i, doc in enumerate(children):
+                self.siblings.setdefault(doc.filename, (
+                    children[i - 1] if i > 0 else None,
+                    children[i + 1] if i < len(children) - 1 else None,
+                ))
+
+        for doc in documents:
+            section = doc.section
+            if section not in self.sections:
+                self.sections[section] = {
+                    'name': section,
+                    'order': doc.section_order,
+                    'documents': []
+                }
+            self.sections[section]['documents'].append(doc)
+        self.sections = dict(sorted(self.sections.items(), key=lambda x: x[1]['order']))
+        # What the sidebar lists: real documents, by order within a section.
+        for section in self.sections.values():
+            section['nav_documents'] = tuple(
+                doc for doc in DocumentColumns(section['documents']).order_by('order') if not doc.is_virtual
+            )
+
+        self.recently_updated = tuple(self.columns.where('recently_updated'))
+        real_docs = self.columns.where('is_virtual', False)
+        self.first_document = min(
+            real_docs, key=lambda d: (d.section_order, d.order, d.filename), default=None
+        )
+
+_navigation = None
+
+def get_navigation():
+    global _navigation
+    generation, documents = document_index.snapshot()
+    navigation = _navigation
+    if navigation is None or navigation.generation != generation:
+        navigation = NavigationTree(documents, generation)
+        _navigation = navigation
+    return navigation
+
 def get_sections():
-    documents = get_all_documents()
-    sections = {}
-    
-    for doc in documents:
-        section = doc.get('section', 'Documentation')
-        if section not in sections:
-            sections[section] = {
-                'name': section,
-                'order': doc.get('section_order', 999),
-                'documents': []
-            }
-        sections[section]['documents'].append(doc)
-    
-    return dict(sorted(sections.items(), key=lambda x: x[1]['order']))
+    return get_navigation().sections
 
 def get_documents_by_section():
     return get_sections()
@@ -168,35 +640,53 @@ def get_documents_by_category():
     return get_sections()
 
 def get_subdocuments(parent_path):
-    documents = get_all_documents()
-    return sorted(
-        [doc for doc in documents if doc.get('parent') == parent_path],
-        key=lambda x: x['order']
-    )
+    return get_navigation().children.get(parent_path, [])
 
 def get_first_subdocument(parent_path):
     subdocs = get_subdocuments(parent_path)
-    if subdocs:
-        return min(subdocs, key=lambda x: x['order'])
-    return None
+    return subdocs[0] if subdocs else None
 
 def get_sibling_navigation(doc_path):
     if '/' not in doc_path:
         return None, None
-    
-    parent_path = '/'.join(doc_path.split('/')[:-1])
-    subdocs = sorted(get_subdocuments(parent_path), key=lambda x: x['order'])
-    
-    current_index = None
-    for i, doc in enumerate(subdocs):
-        if doc['filename'] == doc_path:
-            current_index = i
-            break
-    
-    if current_index is None:
-        return None, None
-    
-    prev_doc = subdocs[current_index - 1] if current_index > 0 else None
-    next_doc = subdocs[current_index + 1] if current_index < len(subdocs) - 1 else None
-    
-    return prev_doc, next_doc
+    return get_navigation().siblings.get(doc_path, (None, None))
+
+class FileStat(collections.namedtuple('FileStat', ['st_mtime_ns', 'st_size'])):
+    # The parts of os.stat_result the page routes use, from the index.
+    @property
+    def st_mtime(self):
+        return self.st_mtime_ns / 1e9
+
+class Route(collections.namedtuple('Route', ['kind', 'path', 'mtime_ns', 'size', 'redirect'])):
+    def stat(self):
+        return FileStat(self.mtime_ns, self.size)
+
+class RouteTable:
+    # Sanitized URL path -> what serves it, so resolving a page, a folder
+    # redirect or a 404 is a dict lookup instead of probing the docs tree.
+    # A page beats a folder of the same name, and .html beats .md.
+    def __init__(self, files, folders, navigation):
+        self.generation = navigation.generation
+        self.routes = {}
+        for name, path in folders.items():
+            children = navigation.children.get(name)
+            self.routes[name] = Route('folder', path, None, None, children[0]['filename'] if children else None)
+        for name, variants in files.items():
+            for extension, kind in (('.md', 'markdown'), ('.html', 'html')):
+                if extension in variants:
+                    path, mtime_ns, size = variants[extension]
+                    self.routes[name] = Route(kind, path, mtime_ns, size, None)
+
+    def resolve(self, name):
+        return self.routes.get(name)
+
+_routes = None
+
+def get_routes():
+    global _routes
+    navigation = get_navigation()
+    routes = _routes
+    if routes is None or routes.generation != navigation.generation:
+        routes = RouteTable(*document_index.route_files(), navigation)
+        _routes = routes
+    return routes
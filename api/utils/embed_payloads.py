@@ -0,0 +1,167 @@
+import html
+import json
+import logging
+import re
+from api.utils.block_cache import BlockCache
+from api.config import EMBED_PAYLOAD_VALIDATE, EMBED_PAYLOAD_COMPACT, EMBED_PAYLOAD_CACHE_ENTRIES
+
+logger = logging.getLogger(__name__)
+
+GLSL_COMMENT_RE = re.compile(r'//[^\n]*|/\*.*?\*/', re.DOTALL)
+GLSL_WORD_CHARS = frozenset('abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_.')
+GLSL_OPERATOR_CHARS = frozenset('+-*/%<>=!&|^~?:')
+GLSL_BRACKETS = {')': '(', ']': '[', '}': '{'}
+
+payload_cache = BlockCache(max_entries=EMBED_PAYLOAD_CACHE_ENTRIES)
+
+# "warn" logs a payload that would not load and still sends it, "strict"
+# replaces it with an error box, "off" skips the checks.
+if EMBED_PAYLOAD_VALIDATE in {'0', 'false', 'no', 'off', ''}:
+    VALIDATE_MODE = 'off'
+elif EMBED_PAYLOAD_VALIDATE == 'strict':
+    VALIDATE_MODE = 'strict'
+else:
+    VALIDATE_MODE = 'warn'
+
+class InvalidPayload(ValueError):
+    pass
+
+def _reject_constant(name):
+    # Python accepts NaN and Infinity, the browser's JSON.parse does not.
+    raise ValueError(f"{name} is not valid JSON")
+
+GLSL_CONDITIONAL_RE = re.compile(r'#\s*(if|ifdef|ifndef|elif|else|endif)\b')
+
+def _preprocessor_lines(lines):
+    # (line, is_directive) for each line; a directive's "\" continuation
+    # lines belong to it.
+    continued = False
+    for line in lines:
+        directive = continued or line.lstrip().startswith('#')
+        continued = directive and line.rstrip().endswith('\\')
+        yield line, directive
+
+def _first_branch_lines(lines):
+    # (line number, line) for the code outside directives, keeping only the
+    # first branch of each #if/#ifdef: the branches are alternatives, and
+    # each one may open a block that the code after #endif closes.
+    skipping = []
+    for line_number, (line, directive) in enumerate(_preprocessor_lines(lines), 1):
+        if directive:
+            match = GLSL_CONDITIONAL_RE.match(line.strip())
+            if match is None:
+                continue
+            keyword = match.group(1)
+            if keyword.startswith('if'):
+                skipping.append(False)
+            elif keyword == 'endif':
+                if skipping:
+                    skipping.pop()
+            elif skipping:
+                skipping[-1] = True
+            continue
+        if not any(skipping):
+            yield line_number, line
+
+def _check_glsl(code):
+    without_comments = GLSL_COMMENT_RE.sub(' ', code)
+    if '/*' in without_comments:
+        raise InvalidPayload("unterminated /* comment")
+
+    stack = []
+    for line_number, line in _first_branch_lines(without_comments.split('\n')):
+        for char in line:
+            if char in '([{':
+                stack.append((char, line_number))
+            elif char in GLSL_BRACKETS:
+                if not stack or stack[-1][0] != GLSL_BRACKETS[char]:
+                    raise InvalidPayload(f"unexpected '{char}' on line {line_number}")
+                stack.pop()
+    if stack:
+        char, line_number = stack[-1]
+        raise InvalidPayload(f"'{char}' on line {line_number} is never closed")
+
+def _join_tokens(left, right):
+    # One space only where dropping it would merge two tokens: two words
+    # ("float x") or two operators ("a - -b", "x / *p").
+    if not left or not right:
+        return ''
+    if left[-1] in GLSL_WORD_CHARS and right[0] in GLSL_WORD_CHARS:
+        return ' '
+    if left[-1] in GLSL_OPERATOR_CHARS and right[0] in GLSL_OPERATOR_CHARS:
+        return ' '
+    return ''
+
+def compact_glsl(code):
+    # GLSL has no string literals, so every "//" and "/*" starts a comment.
+    # Preprocessor directives, with their continuation lines, are kept
+    # whole and each on a line of its own.
+    lines = []
+    pending = ''
+    for line, directive in _preprocessor_lines(GLSL_COMMENT_RE.sub(' ', code).split('\n')):
+        if directive:
+            if pending:
+                lines.append(pending)
+                pending = ''
+            lines.append(line.strip())
+            continue
+        for token in re.findall(r'\S+', line):
+            pending += _join_tokens(pending, token) + token
+    if pending:
+        lines.append(pending)
+    return '\n'.join(lines)
+
+def _check_json(config):
+    try:
+        value = json.loads(config, parse_constant=_reject_constant)
+    except json.JSONDecodeError as e:
+        raise InvalidPayload(f"{e.msg} (line {e.lineno}, column {e.colno})")
+    except ValueError as e:
+        raise InvalidPayload(str(e))
+    if not isinstance(value, dict):
+        raise InvalidPayload("expected a JSON object")
+    return value
+
+def _prepare(kind, payload, compact):
+    if kind == 'glsl':
+        _check_glsl(payload)
+        return compact_glsl(payload) if compact else payload
+    if kind == 'json':
+        value = _check_json(payload)
+        if compact:
+            return json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+        return payload
+    raise ValueError(f"unknown payload kind: {kind}")
+
+def prepare_payload(kind, payload, compact=EMBED_PAYLOAD_COMPACT, mode=VALIDATE_MODE):
+    # Returns (payload, error). The payload comes back compacted when
+    # EMBED_PAYLOAD_COMPACT is on. error is only set in strict mode, when
+    # the payload would not load; otherwise it is logged and sent as is.
+    if mode == 'off' and not compact:
+        return payload, None
+
+    key = payload_cache.make_key(payload, kind, bool(compact))
+    entry = payload_cache.get(key)
+    if entry is None:
+        try:
+            entry = (_prepare(kind, payload, compact), None)
+        except InvalidPayload as e:
+            entry = (None, str(e))
+        payload_cache.set(key, entry)
+
+    if entry[1] is not None:
+        logger.warning(f"Invalid {kind} embed payload: {entry[1]}")
+        if mode != 'strict':
+            return payload, None
+    return entry
+
+def payload_error_html(label, error):
+    return f'''<div class="mdoc-hint mdoc-hint-error">
+    <div class="hint-header">
+        <div class="hint-icon"><span class="material-symbols-rounded">error</span></div>
+        <div class="hint-title">Invalid {html.escape(label)}</div>
+    </div>
+    <div class="hint-content">
+        <p>{html.escape(error)}</p>
+    </div>
+</div>'''
@@ -0,0 +1,93 @@
+import base64
+import hashlib
+import logging
+import os
+import re
+import tempfile
+from api.config import EMBED_STORE_ENABLED, EMBED_STORE_DIR, RENDER_CACHE_READONLY
+
+logger = logging.getLogger(__name__)
+
+EMBED_KEY_RE = re.compile(r'^[0-9a-f]{64}$')
+
+class EmbedStore:
+    # Content-addressed: a payload's key is its sha256, so an entry never
+    # changes once written and pages rendered against it stay valid.
+    def __init__(self, directory, readonly=False, enabled=True):
+        self.directory = directory
+        self.readonly = readonly
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+
+    @staticmethod
+    def make_key(data):
+        return hashlib.sha256(data).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key)
+
+    def put(self, data):
+        key = self.make_key(data)
+        path = self._path(key)
+        if os.path.exists(path):
+            return key
+        if self.readonly:
+            return None
+
+        directory = os.path.dirname(path)
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+            except BaseException:
+                try:
+                    os.unlink(tmp_path)
+                except OSError:
+                    pass
+                raise
+        except OSError as e:
+            logger.warning(f"Embed store write failed, switching to read-only: {e}")
+            self.readonly = True
+            return None
+
+        self.writes += 1
+        return key
+
+    def get(self, key):
+        if not EMBED_KEY_RE.match(key):
+            return None
+        try:
+            with open(self._path(key), 'rb') as f:
+                data = f.read()
+        except OSError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return data
+
+    def stats(self):
+        return {
+            'enabled': self.enabled,
+            'readonly': self.readonly,
+            'directory': self.directory,
+            'hits': self.hits,
+            'misses': self.misses,
+            'writes': self.writes,
+        }
+
+embed_store = EmbedStore(EMBED_STORE_DIR, readonly=RENDER_CACHE_READONLY, enabled=EMBED_STORE_ENABLED)
+
+def payload_attribute(attribute, payload):
+    # The placeholder attribute for an embed payload: a reference into the
+    # embed store when it is enabled, the inline base64 payload otherwise.
+    data = payload.encode('utf-8')
+    if embed_store.enabled:
+        key = embed_store.put(data)
+        if key is not None:
+            return f'data-embed="{key}"'
+    return f'{attribute}="{base64.b64encode(data).decode("ascii")}"'
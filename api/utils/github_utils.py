@@ -232,6 +232,9 @@ def get_last_updated(template_name):
             return None
     return None
 
+def is_recently_modified(mtime):
+    return (datetime.now() - datetime.fromtimestamp(mtime)) <= timedelta(days=RECENTLY_UPDATED_DAYS)
+
 def is_recently_updated(template_name):
     local_last_modified = _get_local_last_modified(template_name)
     if local_last_modified is not None:
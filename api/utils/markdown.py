@@ -1,8 +1,12 @@
 import markdown
 import re
+import collections
 import bleach
 import os
+import json
+import hashlib
 import functools
+import threading
 from api.extensions.glsl import GlslExtension
 from api.extensions.desmos import DesmosExtension
 from api.extensions.mermaid import MermaidExtension
@@ -13,9 +17,24 @@ from api.extensions.iframe import IframeExtension
 from api.extensions.hint import HintExtension
 from api.extensions.tabs import TabsExtension
 from api.extensions.badge import BadgeExtension
-from api.utils.cross_reference import process_cross_references
-from api.utils.table_of_contents import generate_table_of_contents, add_ids_to_headings
-from markdown.extensions.codehilite import CodeHiliteExtension
+from api.extensions.document_tree import DocumentTreeExtension
+from api.extensions.sanitizer import SanitizerExtension
+from api.extensions.highlight import HighlightExtension
+from api.utils.cross_reference import process_cross_references, get_reference_digest
+from api.utils.documents import get_documents_generation
+from api.utils.table_of_contents import index_headings
+from api.utils.markdown_pool import MarkdownPool
+from api.utils.render_cache import render_cache
+from api.utils.block_cache import block_cache, split_markdown_blocks
+from api.utils.syntax_highlight import get_syntax_highlight_mode
+from api.utils.embed_store import embed_store
+from api.utils.profiling import stage, instrument_markdown_engine
+from api.utils.slow_renders import slow_render_log, document_label
+from api.utils.render_workers import (
+    RenderBudgetExceeded, DEGRADED_SOURCE_BYTES, render_workers, check_input_size, record_budget_offender,
+    render_degraded_html,
+)
+from api.config import MARKDOWN_POOL_SIZE, DOCS_DIR, SANITIZER_BACKEND, SYNTAX_HIGHLIGHT_STYLE, EMBED_PAYLOAD_VALIDATE, EMBED_PAYLOAD_COMPACT
 from markdown.extensions.fenced_code import FencedCodeExtension
 from markdown.extensions.tables import TableExtension
 
@@ -47,6 +66,7 @@ ALLOWED_ATTRIBUTES = {
         'data-diagram',
         'data-geogebra-config',
         'data-sketch-code',
+        'data-embed',
     ],
     'canvas': ['width', 'height', 'class', 'id'],
     'select': ['class', 'id'],
@@ -71,22 +91,98 @@ ALLOWED_ATTRIBUTES = {
 
 ALLOWED_PROTOCOLS = ['http', 'https', 'mailto', 'tel', 'ftp', '#']
 
-MARKDOWN_EXTENSIONS = [
-    TableExtension(),
-    FencedCodeExtension(),
-    TabsExtension(),
-    GlslExtension(),
-    BadgeExtension(),
-    DesmosExtension(),
-    MermaidExtension(),
-    GeoGebraExtension(),
-    P5jsExtension(),
-    VideoExtension(),      
-    IframeExtension(),
-    HintExtension(),      
-    'toc',
-    'md_in_html'
-]
+SANITIZER_BACKENDS = ('tree', 'bleach')
+
+FEATURE_EXTENSIONS = {
+    'tabs': TabsExtension,
+    'glsl': GlslExtension,
+    'desmos': DesmosExtension,
+    'mermaid': MermaidExtension,
+    'geogebra': GeoGebraExtension,
+    'p5js': P5jsExtension,
+    'video': VideoExtension,
+    'iframe': IframeExtension,
+    'hint': HintExtension,
+}
+FEATURES = frozenset(FEATURE_EXTENSIONS)
+
+# Deliberately loose: a false positive only loads an extension that finds
+# nothing to do.
+FEATURE_PATTERN = re.compile(
+    r'^\s*(?:`{3,}(' + '|'.join(FEATURE_EXTENSIONS) + r')|!\[(video|iframe)\]\()',
+    re.MULTILINE,
+)
+
+def detect_features(md_content):
+    return frozenset(name for match in FEATURE_PATTERN.finditer(md_content) for name in match.groups() if name)
+
+def build_markdown_extensions(sanitizer=SANITIZER_BACKEND, features=None):
+    features = FEATURES if features is None else features
+
+    def feature(name):
+        return [FEATURE_EXTENSIONS[name]()] if name in features else []
+
+    extensions = [
+        TableExtension(),
+        FencedCodeExtension(),
+        *feature('tabs'),
+        *feature('glsl'),
+        BadgeExtension(),
+        *feature('desmos'),
+        *feature('mermaid'),
+        *feature('geogebra'),
+        *feature('p5js'),
+        *feature('video'),
+        *feature('iframe'),
+        *feature('hint'),
+        'toc',
+        'md_in_html',
+        DocumentTreeExtension()
+    ]
+    if get_syntax_highlight_mode() == 'server':
+        extensions.append(HighlightExtension())
+    if sanitizer == 'tree':
+        extensions.append(SanitizerExtension(
+            tags=ALLOWED_TAGS,
+            attributes=ALLOWED_ATTRIBUTES,
+            protocols=ALLOWED_PROTOCOLS,
+        ))
+    return extensions
+
+MARKDOWN_EXTENSIONS = build_markdown_extensions()
+
+def create_markdown_engine(sanitizer=SANITIZER_BACKEND, features=None):
+    engine = markdown.Markdown(extensions=build_markdown_extensions(sanitizer, features), output_format='html5')
+    engine.mdoc_sanitizer = sanitizer
+    engine.mdoc_features = features
+    return instrument_markdown_engine(engine)
+
+markdown_pool = MarkdownPool(create_markdown_engine, size=MARKDOWN_POOL_SIZE)
+_markdown_pools = {(SANITIZER_BACKEND, None): markdown_pool}
+_markdown_pools_lock = threading.Lock()
+
+def get_markdown_pool(sanitizer=SANITIZER_BACKEND, features=None):
+    # One pool per sanitizer backend and feature set; features=None is the
+    # full extension list.
+    if sanitizer not in SANITIZER_BACKENDS:
+        raise ValueError(f"Unknown sanitizer backend: {sanitizer}")
+    if features is not None:
+        features = frozenset(features) & FEATURES
+    key = (sanitizer, features)
+    pool = _markdown_pools.get(key)
+    if pool is None:
+        with _markdown_pools_lock:
+            pool = _markdown_pools.get(key)
+            if pool is None:
+                pool = MarkdownPool(functools.partial(create_markdown_engine, sanitizer, features), size=MARKDOWN_POOL_SIZE)
+                _markdown_pools[key] = pool
+    return pool
+
+def get_markdown_pool_stats():
+    return {
+        f"{sanitizer}:{'all' if features is None else '+'.join(sorted(features)) or 'none'}": pool.stats()
+        for (sanitizer, features), pool in list(_markdown_pools.items())
+    }
 
 def extract_title_from_markdown(md_content):
     if not md_content:
@@ -112,63 +208,244 @@ def extract_description_from_markdown(md_content):
 
     return description
 
+API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RENDERING_UTILS = (
+    'markdown', 'block_cache', 'cross_reference', 'table_of_contents', 'embed_payloads', 'embed_store',
+    'syntax_highlight', 'render_workers',
+)
+
+@functools.lru_cache(maxsize=1)
+def get_pipeline_fingerprint():
+    digest = hashlib.sha256()
+    digest.update(f"markdown={markdown.__version__};bleach={bleach.__version__};sanitizer={SANITIZER_BACKEND}".encode('utf-8'))
+    digest.update(f"highlight={get_syntax_highlight_mode()}:{SYNTAX_HIGHLIGHT_STYLE};embeds={embed_store.enabled}".encode('utf-8'))
+    digest.update(f"payloads={EMBED_PAYLOAD_VALIDATE}:{EMBED_PAYLOAD_COMPACT}".encode('utf-8'))
+    digest.update(json.dumps([ALLOWED_TAGS, ALLOWED_ATTRIBUTES, ALLOWED_PROTOCOLS], sort_keys=True).encode('utf-8'))
+
+    for ext in MARKDOWN_EXTENSIONS:
+        name = ext if isinstance(ext, str) else f"{type(ext).__module__}.{type(ext).__name__}"
+        digest.update(name.encode('utf-8'))
+
+    # Every extension, whether or not it is registered directly (fences
+    # and counters are used by others), plus the utils that shape the HTML.
+    extensions_dir = os.path.join(API_DIR, 'extensions')
+    source_paths = [os.path.join(extensions_dir, name) for name in os.listdir(extensions_dir) if name.endswith('.py')]
+    source_paths += [os.path.join(API_DIR, 'utils', f"{name}.py") for name in RENDERING_UTILS]
+    for source_path in sorted(source_paths):
+        digest.update(os.path.relpath(source_path, API_DIR).replace(os.sep, '/').encode('utf-8'))
+        with open(source_path, 'rb') as f:
+            digest.update(f.read())
+
+    return digest.hexdigest()[:16]
+
+def _render_cache_key(md_content):
+    # Cross-reference output embeds other documents' titles, so those only
+    # take part in the key when the source actually uses [[...]].
+    extra = (get_reference_digest(),) if '[[' in md_content else ()
+    return render_cache.make_key(md_content, get_pipeline_fingerprint(), *extra)
+
+RenderedDocument = collections.namedtuple('RenderedDocument', ['title', 'description', 'html', 'features', 'headings'])
+
 @functools.lru_cache(maxsize=256)
-def _render_markdown_file_cached(md_path, mtime_ns):
+def _render_markdown_file_cached(md_path, mtime_ns, documents_generation):
+    # Also keyed on the document generation, since cross-references show
+    # other documents' titles; the render cache key covers those itself.
     with open(md_path, 'r', encoding='utf-8') as f:
         md_content = f.read()
 
+    cache_key = _render_cache_key(md_content)
+    entry = render_cache.get(cache_key)
+    if entry is not None:
+        return RenderedDocument(
+            entry['title'], entry['description'], entry['html'], frozenset(entry['features']), entry.get('headings', []),
+        )
+
     title = extract_title_from_markdown(md_content)
     description = extract_description_from_markdown(md_content)
 
-    safe_html = convert_markdown_to_html(md_content)
-    safe_html = remove_first_h1(safe_html)
-    return title, description, safe_html
+    try:
+        with slow_render_log.track(document_label(md_path)):
+            if render_workers.enabled:
+                with stage('render-worker'):
+                    safe_html, headings, features = render_workers.render(md_path, md_content, drop_first_h1=True, mtime_ns=mtime_ns)
+            else:
+                safe_html, headings, features = _render_markdown(md_content, drop_first_h1=True)
+    except RenderBudgetExceeded:
+        # Not cached: the next request gets another try.
+        raise
+    except Exception as e:
+        print(f"Error converting Markdown to HTML: {str(e)}")
+        return RenderedDocument(title, description, f"<p>Error processing content: {str(e)}</p>", frozenset(), [])
 
-def render_markdown_file(md_path):
-    mtime_ns = os.stat(md_path).st_mtime_ns
-    return _render_markdown_file_cached(md_path, mtime_ns)
+    render_cache.set(cache_key, {
+        'title': title,
+        'description': description,
+        'html': safe_html,
+        'features': sorted(features),
+        'headings': headings,
+    })
+    return RenderedDocument(title, description, safe_html, features, headings)
 
-def convert_markdown_to_html(md_content):
-    try:
-        md_content = process_cross_references(md_content)
+def render_markdown_file(md_path, stat=None):
+    if stat is None:
+        stat = os.stat(md_path)
+    check_input_size(md_path, stat.st_size)
+    return _render_markdown_file_cached(md_path, stat.st_mtime_ns, get_documents_generation())
 
-        html_content = markdown.markdown(
-            md_content,
-            extensions=MARKDOWN_EXTENSIONS,
-            output_format='html5'
-        )
+def render_degraded_document(md_path, error):
+    record_budget_offender(error)
+    with open(md_path, 'r', encoding='utf-8', errors='replace') as f:
+        md_content = f.read(DEGRADED_SOURCE_BYTES + 1)
+    return RenderedDocument(
+        extract_title_from_markdown(md_content),
+        extract_description_from_markdown(md_content),
+        render_degraded_html(md_content, error),
+        frozenset(),
+        [],
+    )
 
-        html_content = add_ids_to_headings(html_content)
+def preload_rendered_documents():
+    manifest = render_cache.read_manifest()
+    if not manifest:
+        return 0
 
-        def enhance_external_link(match):
-            href = match.group(1)
-            rest_of_tag = match.group(2)
-            content = match.group(3)
+    if manifest.get('fingerprint') != get_pipeline_fingerprint():
+        print("Prerendered documents were built by a different rendering pipeline, skipping preload")
+        return 0
 
-            if href.startswith(('http://', 'https://')):
-                if 'target=' not in rest_of_tag:
-                    rest_of_tag += ' target="_blank"'
-                if 'rel=' not in rest_of_tag:
-                    rest_of_tag += ' rel="noopener noreferrer"'
-                if 'class=' not in rest_of_tag:
-                    rest_of_tag += ' class="external-link-button"'
+    loaded = 0
+    for doc in manifest.get('documents', []):
+        md_path = os.path.join(DOCS_DIR, doc['path'])
+        try:
+            render_markdown_file(md_path)
+        except (OSError, RenderBudgetExceeded):
+            continue
+        loaded += 1
+    return loaded
 
-            return f'<a href="{href}"{rest_of_tag}>{content}</a>'
+def warmup_markdown_pools():
+    # Engines for the feature sets the prerendered documents need, or the
+    # full extension list when there is no manifest to go by.
+    manifest = render_cache.read_manifest()
+    feature_sets = {frozenset(doc['features']) for doc in (manifest or {}).get('documents', []) if 'features' in doc}
+    if not feature_sets:
+        markdown_pool.warmup()
+        return 1
 
-        link_pattern = r'<a href="([^"]*)"([^>]*)>(.*?)</a>'
-        html_content = re.sub(link_pattern, enhance_external_link, html_content, flags=re.DOTALL)
+    for features in feature_sets:
+        get_markdown_pool(SANITIZER_BACKEND, features).warmup(1)
+    return len(feature_sets)
 
-        safe_html = bleach.clean(
-            html_content,
-            tags=ALLOWED_TAGS,
-            attributes=ALLOWED_ATTRIBUTES,
-            protocols=ALLOWED_PROTOCOLS,
-            strip=False,
-            strip_comments=False
-        )
+def render_nested_markdown(md_content, parent_md):
+    # Tab panels and hint bodies go through the same pipeline as the page,
+    # on a pooled engine, sharing the page's id counters.
+    pool = get_markdown_pool(
+        getattr(parent_md, 'mdoc_sanitizer', SANITIZER_BACKEND),
+        getattr(parent_md, 'mdoc_features', None),
+    )
+    with pool.acquire() as md:
+        md.mdoc_drop_first_h1 = False
+        md.mdoc_counters = getattr(parent_md, 'mdoc_counters', None)
+        md.mdoc_nested_headings = []
+        html_content = md.convert(md_content)
+        parent_headings = getattr(parent_md, 'mdoc_nested_headings', None)
+        if parent_headings is not None:
+            parent_headings.extend(md.mdoc_headings)
+            parent_headings.extend(md.mdoc_nested_headings)
+        return html_content
+
+def _render_markdown_blocks(md_content, drop_first_h1, sanitizer, features):
+    blocks = split_markdown_blocks(md_content)
+    if not blocks or len(blocks) == 1:
+        return None
 
-        return safe_html
+    # Blocks render the same with any feature set that covers the page, so
+    # the feature set is not part of the block key.
+    pool = get_markdown_pool(sanitizer, features)
+    counters = {}
+    parts = []
+    headings = []
+    nested_headings = []
+    heading_ids = []
 
+    for block in blocks:
+        # A block renders the same wherever it sits in the page, as long as
+        # it starts from the same ids and the same pending first-h1 drop.
+        key = block_cache.make_key(block, sanitizer, drop_first_h1, sorted(counters.items()))
+        entry = block_cache.get(key)
+        if entry is None:
+            with pool.acquire() as md:
+                md.mdoc_drop_first_h1 = drop_first_h1
+                md.mdoc_counters = dict(counters)
+                md.mdoc_nested_headings = []
+                html_block = md.convert(block)
+                entry = (
+                    html_block,
+                    md.mdoc_trailing_whitespace if html_block else '',
+                    md.mdoc_headings,
+                    md.mdoc_nested_headings,
+                    md.mdoc_counters,
+                    md.mdoc_drop_first_h1,
+                    md.mdoc_dropped_heading_id,
+                )
+            block_cache.set(key, entry)
+
+        html_block, trailing_whitespace, block_headings, block_nested_headings, counters, drop_first_h1, dropped_id = entry
+        counters = dict(counters)
+        if html_block:
+            parts.append(html_block)
+            parts.append(trailing_whitespace + '\n')
+        headings.extend(block_headings)
+        nested_headings.extend(block_nested_headings)
+        if dropped_id:
+            heading_ids.append(dropped_id)
+
+    heading_ids.extend(heading['id'] for heading in headings)
+    if len(set(heading_ids)) != len(heading_ids):
+        # toc de-duplicates ids across the whole page; let it.
+        return None
+
+    return ''.join(parts[:-1]), headings + nested_headings
+
+def _render_markdown(md_content, drop_first_h1=False, sanitizer=SANITIZER_BACKEND):
+    with stage('cross-refs'):
+        md_content = process_cross_references(md_content)
+    features = detect_features(md_content)
+
+    with stage('markdown'):
+        rendered = _render_markdown_blocks(md_content, drop_first_h1, sanitizer, features) if block_cache.enabled else None
+        if rendered is not None:
+            html_content, headings = rendered
+        else:
+            with get_markdown_pool(sanitizer, features).acquire() as md:
+                md.mdoc_drop_first_h1 = drop_first_h1
+                md.mdoc_counters = {}
+                md.mdoc_nested_headings = []
+                html_content = md.convert(md_content)
+                headings = md.mdoc_headings + md.mdoc_nested_headings
+
+    if sanitizer == 'bleach':
+        with stage('bleach'):
+            html_content = bleach.clean(
+                html_content,
+                tags=ALLOWED_TAGS,
+                attributes=ALLOWED_ATTRIBUTES,
+                protocols=ALLOWED_PROTOCOLS,
+                strip=False,
+                strip_comments=False
+            )
+
+    # Tab panels and hint bodies are rendered separately, so their headings
+    # are put in page order by where they ended up.
+    return html_content, index_headings(html_content, headings), features
+
+def _convert_markdown_to_html(md_content, drop_first_h1=False):
+    return _render_markdown(md_content, drop_first_h1=drop_first_h1)[0]
+
+def convert_markdown_to_html(md_content, drop_first_h1=False, source='<inline>'):
+    try:
+        with slow_render_log.track(source):
+            return _convert_markdown_to_html(md_content, drop_first_h1=drop_first_h1)
     except Exception as e:
         print(f"Error converting Markdown to HTML: {str(e)}")
         return f"<p>Error processing content: {str(e)}</p>"
@@ -0,0 +1,66 @@
+import contextlib
+import logging
+import queue
+import threading
+
+logger = logging.getLogger(__name__)
+
+class MarkdownPool:
+    def __init__(self, factory, size=4):
+        self._factory = factory
+        self._size = max(1, int(size))
+        self._idle = queue.LifoQueue(maxsize=self._size)
+        self._lock = threading.Lock()
+        self._created = 0
+        self._borrowed = 0
+
+    def _create(self):
+        engine = self._factory()
+        with self._lock:
+            self._created += 1
+        return engine
+
+    def warmup(self, count=None):
+        target = self._size if count is None else min(int(count), self._size)
+        while self._idle.qsize() < target:
+            try:
+                self._idle.put_nowait(self._create())
+            except queue.Full:
+                break
+        logger.info(f"Markdown pool warmed with {self._idle.qsize()} engine(s)")
+
+    @contextlib.contextmanager
+    def acquire(self):
+        try:
+            engine = self._idle.get_nowait()
+        except queue.Empty:
+            # Every engine is busy (or the pool is cold): build one rather than
+            # block the request thread. Extras are dropped on release.
+            engine = self._create()
+
+        with self._lock:
+            self._borrowed += 1
+        try:
+            yield engine
+        finally:
+            engine.reset()
+            try:
+                self._idle.put_nowait(engine)
+            except queue.Full:
+                pass
+
+    def clear(self):
+        while True:
+            try:
+                self._idle.get_nowait()
+            except queue.Empty:
+                break
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': self._size,
+                'idle': self._idle.qsize(),
+                'created': self._created,
+                'borrowed': self._borrowed,
+            }
@@ -0,0 +1,203 @@
+import bisect
+import contextlib
+import contextvars
+import functools
+import re
+import threading
+import time
+from api.config import RENDER_PROFILING_ENABLED, DEBUG_STATS_ENABLED
+
+# Upper bounds in milliseconds; the last bucket catches everything slower.
+HISTOGRAM_BOUNDS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+SERVER_TIMING_NAME_RE = re.compile(r"[^A-Za-z0-9!#$%&'*+.^_`|~-]")
+
+_current_profile = contextvars.ContextVar('mdoc_render_profile', default=None)
+
+class RenderProfile:
+    def __init__(self, parent=None):
+        self.start = time.perf_counter()
+        self.parent = parent
+        self.durations = {}
+        self.blocks = []
+        self._block_counts = {}
+
+    def add(self, name, elapsed_ms):
+        self.durations[name] = self.durations.get(name, 0.0) + elapsed_ms
+        if self.parent is not None:
+            self.parent.add(name, elapsed_ms)
+
+    def next_block_label(self, kind):
+        # Numbered in the order the fences are rendered, page-wide.
+        count = self._block_counts.get(kind, 0) + 1
+        self._block_counts[kind] = count
+        return f"{kind} #{count}"
+
+    def add_block(self, label, opening, elapsed_ms):
+        self.blocks.append((label, opening, elapsed_ms))
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - self.start) * 1000
+
+    def server_timing(self):
+        return ', '.join(
+            f"{SERVER_TIMING_NAME_RE.sub('-', name)};dur={elapsed_ms:.2f}"
+            for name, elapsed_ms in self.durations.items()
+        )
+
+class TimingHistogram:
+    def __init__(self, bounds=HISTOGRAM_BOUNDS_MS):
+        self.bounds = bounds
+        self._stages = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, elapsed_ms):
+        with self._lock:
+            stage = self._stages.get(name)
+            if stage is None:
+                stage = self._stages[name] = {'buckets': [0] * (len(self.bounds) + 1), 'count': 0, 'sum': 0.0, 'max': 0.0}
+            stage['buckets'][bisect.bisect_left(self.bounds, elapsed_ms)] += 1
+            stage['count'] += 1
+            stage['sum'] += elapsed_ms
+            stage['max'] = max(stage['max'], elapsed_ms)
+
+    def record_profile(self, profile):
+        for name, elapsed_ms in profile.durations.items():
+            self.record(name, elapsed_ms)
+
+    def _percentile(self, stage, quantile):
+        # Upper bound of the bucket holding the quantile: an over-estimate by
+        # at most one bucket, capped by the slowest sample seen.
+        target = quantile * stage['count']
+        seen = 0
+        for index, count in enumerate(stage['buckets']):
+            seen += count
+            if seen >= target and count:
+                bound = self.bounds[index] if index < len(self.bounds) else stage['max']
+                return min(bound, stage['max'])
+        return stage['max']
+
+    def snapshot(self):
+        with self._lock:
+            stages = {name: dict(stage, buckets=list(stage['buckets'])) for name, stage in self._stages.items()}
+        return {
+            'bounds_ms': list(self.bounds),
+            'stages': {
+                name: {
+                    'count': stage['count'],
+                    'mean_ms': round(stage['sum'] / stage['count'], 3),
+                    'p50_ms': self._percentile(stage, 0.50),
+                    'p95_ms': self._percentile(stage, 0.95),
+                    'p99_ms': self._percentile(stage, 0.99),
+                    'max_ms': round(stage['max'], 3),
+                    'buckets': stage['buckets'],
+                }
+                for name, stage in sorted(stages.items())
+            },
+        }
+
+    def clear(self):
+        with self._lock:
+            self._stages.clear()
+
+timing_store = TimingHistogram()
+
+def start_profile():
+    profile = RenderProfile()
+    return profile, _current_profile.set(profile)
+
+def finish_profile(profile, token):
+    _current_profile.reset(token)
+    profile.add('total', profile.elapsed_ms())
+    timing_store.record_profile(profile)
+    return profile
+
+@contextlib.contextmanager
+def stage(name):
+    profile = _current_profile.get()
+    if profile is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.add(name, (time.perf_counter() - start) * 1000)
+
+@contextlib.contextmanager
+def render_profile():
+    # One document render, nested in the request's profile: its stages still
+    # count towards the request, but it keeps its own total and blocks.
+    profile = RenderProfile(_current_profile.get())
+    token = _current_profile.set(profile)
+    try:
+        yield profile
+    finally:
+        _current_profile.reset(token)
+
+@contextlib.contextmanager
+def fence_block(kind, opening):
+    profile = _current_profile.get()
+    if profile is None or not RENDER_PROFILING_ENABLED:
+        yield
+        return
+    label = profile.next_block_label(kind)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.add_block(label, opening, (time.perf_counter() - start) * 1000)
+
+def _timed(name, func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        profile = _current_profile.get()
+        if profile is None:
+            return func(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profile.add(name, (time.perf_counter() - start) * 1000)
+    return wrapper
+
+def instrument_markdown_engine(md):
+    # Times every preprocessor, the block parser, every treeprocessor and
+    # every postprocessor of one engine under "<kind>.<registered name>".
+    # Nested renders (tab panels, hint bodies) add to the same names.
+    if not RENDER_PROFILING_ENABLED:
+        return md
+    for kind, registry in (('pre', md.preprocessors), ('tree', md.treeprocessors), ('post', md.postprocessors)):
+        # Registry only exposes names through its priority list, which it
+        # re-sorts on lookup: take the names first.
+        for name in [item.name for item in registry._priority]:
+            processor = registry[name]
+            processor.run = _timed(f"{kind}.{name}", processor.run)
+    md.parser.parseDocument = _timed('parse', md.parser.parseDocument)
+    return md
+
+def register_profiling(app):
+    if not RENDER_PROFILING_ENABLED:
+        return
+
+    from flask import g
+
+    @app.before_request
+    def _start_render_profile():
+        g.mdoc_profile = start_profile()
+
+    @app.after_request
+    def _add_server_timing(response):
+        started = g.pop('mdoc_profile', None)
+        if started is None:
+            return response
+        profile, token = started
+        # Requests that never reached an instrumented stage (static files)
+        # are left out of the histograms.
+        if profile.durations:
+            finish_profile(profile, token)
+            # The breakdown is only exposed alongside the debug endpoints.
+            if DEBUG_STATS_ENABLED:
+                response.headers['Server-Timing'] = profile.server_timing()
+        else:
+            _current_profile.reset(token)
+        return response
@@ -0,0 +1,207 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from api.config import RENDER_CACHE_ENABLED, RENDER_CACHE_DIR, RENDER_CACHE_MAX_BYTES, RENDER_CACHE_READONLY
+
+logger = logging.getLogger(__name__)
+
+class RenderCache:
+    def __init__(self, directory, max_bytes=64 * 1024 * 1024, readonly=False, enabled=True):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.readonly = readonly
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        # Counters get their own lock so a hit never waits on an eviction.
+        self._stats_lock = threading.Lock()
+        self._total_bytes = None
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(source, fingerprint, *extra):
+        digest = hashlib.sha256()
+        digest.update(fingerprint.encode('utf-8'))
+        digest.update(b'\0')
+        digest.update(source.encode('utf-8'))
+        for part in extra:
+            digest.update(b'\0')
+            digest.update(part.encode('utf-8'))
+        return digest.hexdigest()
+
+    def _count(self, name):
+        with self._stats_lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def get(self, key):
+        if not self.enabled:
+            return None
+
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            self._count('misses')
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable render cache entry {path}: {e}")
+            self._count('misses')
+            return None
+
+        if not self.readonly:
+            # mtime doubles as the recency marker used for eviction.
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+
+        self._count('hits')
+        return entry
+
+    def set(self, key, entry):
+        if not self.enabled or self.readonly:
+            return False
+
+        data = json.dumps(entry, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        path = self._path(key)
+        directory = os.path.dirname(path)
+
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-', suffix='.json')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                try:
+                    replaced = os.stat(path).st_size
+                except FileNotFoundError:
+                    replaced = 0
+                os.replace(tmp_path, path)
+            except BaseException:
+                try:
+                    os.unlink(tmp_path)
+                except OSError:
+                    pass
+                raise
+        except OSError as e:
+            logger.warning(f"Render cache write failed, switching to read-only: {e}")
+            self.readonly = True
+            return False
+
+        self._count('writes')
+        with self._lock:
+            if self._total_bytes is not None:
+                self._total_bytes += len(data) - replaced
+            if self._get_total_bytes() > self.max_bytes:
+                self._evict()
+        return True
+
+    def _scan(self):
+        entries = []
+        try:
+            shards = os.scandir(self.directory)
+        except OSError:
+            return entries
+        with shards:
+            for shard in shards:
+                if not shard.is_dir():
+                    continue
+                with os.scandir(shard.path) as files:
+                    for item in files:
+                        if item.name.endswith('.json') and not item.name.startswith('.tmp-'):
+                            try:
+                                stat = item.stat()
+                            except OSError:
+                                continue
+                            entries.append((stat.st_mtime, stat.st_size, item.path))
+        return entries
+
+    def _get_total_bytes(self):
+        if self._total_bytes is None:
+            self._total_bytes = sum(size for _, size, _ in self._scan())
+        return self._total_bytes
+
+    def _evict(self):
+        entries = sorted(self._scan())
+        total = sum(size for _, size, _ in entries)
+        target = int(self.max_bytes * 0.9)
+
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.unlink(path)
+            except OSError:
+                continue
+            total -= size
+            self._count('evictions')
+
+        self._total_bytes = total
+
+    @property
+    def manifest_path(self):
+        return os.path.join(self.directory, 'prerender.json')
+
+    def write_manifest(self, manifest):
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix='.tmp-', suffix='.json')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, indent=2)
+            os.replace(tmp_path, self.manifest_path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def read_manifest(self):
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable prerender manifest: {e}")
+            return None
+
+    def clear(self):
+        if self.readonly:
+            return
+        with self._lock:
+            for _, _, path in self._scan():
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+            self._total_bytes = 0
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                'enabled': self.enabled,
+                'readonly': self.readonly,
+                'directory': self.directory,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'writes': self.writes,
+                'evictions': self.evictions,
+            }
+
+render_cache = RenderCache(
+    RENDER_CACHE_DIR,
+    max_bytes=RENDER_CACHE_MAX_BYTES,
+    readonly=RENDER_CACHE_READONLY,
+    enabled=RENDER_CACHE_ENABLED,
+)
@@ -0,0 +1,157 @@
+import collections
+import html
+import logging
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from api.config import RENDER_WORKERS, RENDER_TIMEOUT_SECONDS, RENDER_MAX_INPUT_BYTES
+
+logger = logging.getLogger(__name__)
+
+DEGRADED_SOURCE_BYTES = 64 * 1024
+MAX_REMEMBERED_FAILURES = 256
+
+class RenderBudgetExceeded(Exception):
+    def __init__(self, md_path, reason, **details):
+        self.md_path = md_path
+        self.reason = reason
+        self.details = details
+        super().__init__(f"{reason}: {md_path}")
+
+def _render_in_worker(md_content, drop_first_h1):
+    from api.utils.markdown import _render_markdown
+    return _render_markdown(md_content, drop_first_h1=drop_first_h1)
+
+class RenderWorkerPool:
+    # Renders in worker processes with a wall-clock budget. A render that
+    # overruns cannot be interrupted, so its workers are replaced instead.
+    def __init__(self, workers=0, timeout=10.0):
+        self.workers = max(0, int(workers))
+        self.timeout = timeout
+        self._executor = None
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.timeouts = 0
+        self.broken = 0
+        self.skipped = 0
+        self.recycled = 0
+        self._failed = collections.OrderedDict()
+
+    @property
+    def enabled(self):
+        return self.workers > 0
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            return self._executor
+
+    def _recycle(self, executor):
+        with self._lock:
+            if self._executor is not executor:
+                return
+            self._executor = None
+            self.recycled += 1
+        # ProcessPoolExecutor has no way to stop a running task; terminating
+        # its processes is the only way to get the CPU back.
+        for process in list((getattr(executor, '_processes', None) or {}).values()):
+            process.terminate()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _fail(self, md_path, mtime_ns, reason, start, **details):
+        # Remembered per file version, so a document that keeps taking its
+        # worker down or overrunning fails fast until it is edited.
+        error = RenderBudgetExceeded(
+            md_path, reason, elapsed_ms=round((time.perf_counter() - start) * 1000, 2), **details,
+        )
+        with self._lock:
+            self._failed[(md_path, mtime_ns)] = error
+            self._failed.move_to_end((md_path, mtime_ns))
+            while len(self._failed) > MAX_REMEMBERED_FAILURES:
+                self._failed.popitem(last=False)
+        return error
+
+    def render(self, md_path, md_content, drop_first_h1=True, mtime_ns=None):
+        failed = self._failed.get((md_path, mtime_ns))
+        if failed is not None:
+            self.skipped += 1
+            raise RenderBudgetExceeded(md_path, failed.reason, **failed.details, remembered=True)
+
+        start = time.perf_counter()
+        for attempt in range(2):
+            # One budget for the whole render, retry included.
+            remaining = max(0.0, self.timeout - (time.perf_counter() - start))
+            executor = self._get_executor()
+            try:
+                future = executor.submit(_render_in_worker, md_content, drop_first_h1)
+                self.submitted += 1
+                return future.result(timeout=remaining)
+            except FutureTimeoutError:
+                self.timeouts += 1
+                self._recycle(executor)
+                raise self._fail(md_path, mtime_ns, 'timeout', start, timeout_s=self.timeout)
+            except BrokenProcessPool:
+                # Lost to another document's timeout, or this one took its
+                # worker down: one more try on a fresh pool, same budget.
+                self.broken += 1
+                self._recycle(executor)
+        raise self._fail(md_path, mtime_ns, 'worker crashed', start)
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self):
+        return {
+            'workers': self.workers,
+            'timeout_s': self.timeout,
+            'max_input_bytes': RENDER_MAX_INPUT_BYTES,
+            'submitted': self.submitted,
+            'timeouts': self.timeouts,
+            'broken': self.broken,
+            'skipped': self.skipped,
+            'remembered_failures': len(self._failed),
+            'recycled': self.recycled,
+        }
+
+render_workers = RenderWorkerPool(RENDER_WORKERS, RENDER_TIMEOUT_SECONDS)
+
+_budget_offenders = {}
+_budget_offenders_lock = threading.Lock()
+
+def check_input_size(md_path, size):
+    if size > RENDER_MAX_INPUT_BYTES:
+        raise RenderBudgetExceeded(md_path, 'too large', bytes=size, max_bytes=RENDER_MAX_INPUT_BYTES)
+
+def record_budget_offender(error):
+    logger.warning(f"Render budget exceeded ({error.reason}) for {error.md_path}: {error.details}")
+    with _budget_offenders_lock:
+        entry = _budget_offenders.setdefault(error.md_path, {'path': error.md_path, 'count': 0})
+        entry['count'] += 1
+        entry['reason'] = error.reason
+        entry['details'] = error.details
+        entry['last_seen'] = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+
+def get_budget_offenders():
+    with _budget_offenders_lock:
+        return sorted((dict(entry) for entry in _budget_offenders.values()), key=lambda e: e['count'], reverse=True)
+
+def render_degraded_html(md_content, error):
+    # Escaped source instead of the rendered page, so the content is still
+    # readable while the document is fixed.
+    source = md_content[:DEGRADED_SOURCE_BYTES]
+    truncated = '\n…' if len(md_content) > len(source) else ''
+    return f'''<div class="mdoc-hint mdoc-hint-warning">
+    <div class="hint-header">
+        <div class="hint-icon"><span class="material-symbols-rounded">warning</span></div>
+        <h4 class="hint-title">This page is shown as plain text</h4>
+    </div>
+    <div class="hint-content">
+        <p>Rendering it went over the server's budget ({html.escape(error.reason)}).</p>
+    </div>
+</div>
+<pre><code>{html.escape(source, quote=False)}{truncated}</code></pre>'''
@@ -0,0 +1,107 @@
+import hashlib
+import json
+from flask import render_template
+from markupsafe import Markup, escape
+from api.config import SIDEBAR_MODE
+from api.utils.documents import get_navigation
+
+class Sidebar:
+    # The sidebar HTML for one index generation. Every page lists the same
+    # documents and only the active link differs, so that is marked on the
+    # cached HTML with a string replace instead of a template loop per page.
+    # In lazy mode a page carries the links of its own section only; the
+    # others are fetched from /api/nav by mdoc-nav.js when they come into view.
+    def __init__(self, navigation, mode='full'):
+        self.generation = navigation.generation
+        self.navigation = navigation
+        self.lazy = mode == 'lazy'
+        self.sections = {
+            name: self._render_section(name, section, expanded=True) for name, section in navigation.sections.items()
+        }
+        self.html = ''.join(self.sections.values())
+        # Part of the page ETags: a stable name for this list, unlike the
+        # generation number, which restarts with the process.
+        self.digest = hashlib.sha1(self.html.encode('utf-8')).hexdigest()[:16]
+        self.collapsed = {}
+        self.section_of = {}
+        if self.lazy:
+            for name, section in navigation.sections.items():
+                self.collapsed[name] = self._render_section(name, section, expanded=False)
+                for doc in section['nav_documents']:
+                    self.section_of.setdefault(doc.filename, name)
+        self._pages = {}
+        self._payloads = {}
+
+    def _render_section(self, name, section, expanded):
+        return render_template('sidebar.html', documents_by_category={name: section}, lazy=self.lazy, expanded=expanded)
+
+    def _page_html(self, active):
+        if not self.lazy:
+            return self.html
+        section = self.section_of.get(active)
+        html = self._pages.get(section)
+        if html is None:
+            html = ''.join(
+                expanded if name == section else self.collapsed[name] for name, expanded in self.sections.items()
+            )
+            self._pages[section] = html
+        return html
+
+    def render(self, active=None):
+        html = self._page_html(active)
+        if active:
+            link = f'<a href="/{escape(active)}" class="nav-link '
+            html = html.replace(f'{link}">', f'{link}active">')
+        return Markup(html)
+
+    def _entry(self, doc):
+        return {
+            'filename': doc.filename,
+            'title': doc.title,
+            'has_children': doc.filename in self.navigation.children,
+        }
+
+    def _payload_data(self, section, parent):
+        navigation = self.navigation
+        if section is not None:
+            data = navigation.sections.get(section)
+            if data is None:
+                return None
+            return {'section': section, 'documents': [self._entry(doc) for doc in data['nav_documents']]}
+        if parent is not None:
+            children = navigation.children.get(parent)
+            if children is None:
+                return None
+            return {'parent': parent, 'documents': [self._entry(doc) for doc in children if not doc.is_virtual]}
+        return {
+            'sections': [
+                {'name': name, 'order': data['order'], 'documents': len(data['nav_documents'])}
+                for name, data in navigation.sections.items()
+            ],
+        }
+
+    def payload(self, section=None, parent=None):
+        # (JSON body, ETag) for /api/nav, or None when there is no such
+        # section or folder. Only existing ones are cached, so the cache
+        # is bounded by the tree.
+        key = (section, parent)
+        cached = self._payloads.get(key)
+        if cached is None:
+            data = self._payload_data(section, parent)
+            if data is None:
+                return None
+            body = json.dumps(data, separators=(',', ':'))
+            cached = (body, f"\"{hashlib.sha1(body.encode('utf-8')).hexdigest()}\"")
+            self._payloads[key] = cached
+        return cached
+
+_sidebar = None
+
+def get_sidebar():
+    global _sidebar
+    navigation = get_navigation()
+    sidebar = _sidebar
+    if sidebar is None or sidebar.generation != navigation.generation:
+        sidebar = Sidebar(navigation, SIDEBAR_MODE)
+        _sidebar = sidebar
+    return sidebar
@@ -1,12 +1,25 @@
 import os
-from datetime import datetime
+from datetime import datetime, date
 from api.config import SITE_CONFIG
-from api.utils.documents import get_all_documents
+from api.utils.documents import document_index
 from api.utils.github_utils import get_template_history
 
+_sitemap = (None, None)
+
 def generate_sitemap():
+    # Rebuilt when the document list changes, and daily for the dates.
+    global _sitemap
+    generation, documents = document_index.snapshot()
+    key = (generation, date.today())
+    cached_key, sitemap_xml = _sitemap
+    if cached_key == key:
+        return sitemap_xml
+    sitemap_xml = _build_sitemap(documents)
+    _sitemap = (key, sitemap_xml)
+    return sitemap_xml
+
+def _build_sitemap(documents):
     base_url = SITE_CONFIG['base_url']
-    documents = get_all_documents()
     
     sitemap_xml = '<?xml version="1.0" encoding="UTF-8"?>\n'
     sitemap_xml += '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
@@ -0,0 +1,102 @@
+import collections
+import contextlib
+import json
+import logging
+import logging.handlers
+import os
+import threading
+import time
+from api.config import (
+    DOCS_DIR, RENDER_PROFILING_ENABLED, SLOW_RENDER_THRESHOLD_MS, SLOW_RENDER_LOG_ENTRIES,
+    SLOW_RENDER_LOG_FILE, SLOW_RENDER_LOG_MAX_BYTES, SLOW_RENDER_LOG_BACKUPS,
+)
+from api.utils.profiling import render_profile
+
+logger = logging.getLogger(__name__)
+
+TOP_STAGES = 8
+TOP_BLOCKS = 10
+
+class SlowRenderLog:
+    # The last slow renders, with the stages and fenced blocks that took the
+    # most time, so a page's author can see what to split up or simplify.
+    def __init__(self, threshold_ms=250, max_entries=100, path=None, max_bytes=1024 * 1024, backups=3):
+        self.threshold_ms = threshold_ms
+        self._entries = collections.deque(maxlen=max(1, max_entries))
+        self._lock = threading.Lock()
+        self.recorded = 0
+        self._file_logger = None
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            handler = logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups, encoding='utf-8')
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            self._file_logger = logging.getLogger(f"{__name__}.file")
+            self._file_logger.addHandler(handler)
+            self._file_logger.setLevel(logging.INFO)
+            self._file_logger.propagate = False
+
+    @property
+    def enabled(self):
+        return RENDER_PROFILING_ENABLED and self.threshold_ms > 0
+
+    @contextlib.contextmanager
+    def track(self, source):
+        if not self.enabled:
+            yield
+            return
+        with render_profile() as profile:
+            yield
+        total_ms = profile.elapsed_ms()
+        if total_ms >= self.threshold_ms:
+            self.record(source, total_ms, profile)
+
+    def record(self, source, total_ms, profile):
+        stages = sorted(profile.durations.items(), key=lambda item: item[1], reverse=True)[:TOP_STAGES]
+        blocks = sorted(profile.blocks, key=lambda block: block[2], reverse=True)[:TOP_BLOCKS]
+        entry = {
+            'path': source,
+            'total_ms': round(total_ms, 2),
+            'at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'stages': [{'stage': name, 'ms': round(elapsed_ms, 2)} for name, elapsed_ms in stages],
+            # Inclusive: a tabs group's time covers the blocks inside its panels.
+            'blocks': [{'block': label, 'fence': opening, 'ms': round(elapsed_ms, 2)} for label, opening, elapsed_ms in blocks],
+        }
+        with self._lock:
+            self._entries.append(entry)
+            self.recorded += 1
+
+        costliest = ', '.join(f"{block['block']} {block['ms']:.0f} ms" for block in entry['blocks'][:3])
+        logger.info(f"Slow render ({entry['total_ms']:.0f} ms) for {source}" + (f": {costliest}" if costliest else ''))
+        if self._file_logger is not None:
+            self._file_logger.info(json.dumps(entry))
+
+    def entries(self):
+        with self._lock:
+            return list(reversed(self._entries))
+
+    def stats(self):
+        return {
+            'enabled': self.enabled,
+            'threshold_ms': self.threshold_ms,
+            'max_entries': self._entries.maxlen,
+            'recorded': self.recorded,
+            'file': SLOW_RENDER_LOG_FILE or None,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+slow_render_log = SlowRenderLog(
+    SLOW_RENDER_THRESHOLD_MS,
+    SLOW_RENDER_LOG_ENTRIES,
+    SLOW_RENDER_LOG_FILE,
+    SLOW_RENDER_LOG_MAX_BYTES,
+    SLOW_RENDER_LOG_BACKUPS,
+)
+
+def document_label(md_path):
+    try:
+        return os.path.relpath(md_path, DOCS_DIR).replace(os.sep, '/')
+    except ValueError:
+        return md_path
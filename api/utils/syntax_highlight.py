@@ -0,0 +1,60 @@
+import functools
+import logging
+from api.utils.block_cache import BlockCache
+from api.config import SYNTAX_HIGHLIGHT_MODE, SYNTAX_HIGHLIGHT_STYLE, SYNTAX_HIGHLIGHT_CACHE_ENTRIES
+
+logger = logging.getLogger(__name__)
+
+HIGHLIGHT_CLASS = 'mdoc-hl'
+
+highlight_cache = BlockCache(max_entries=SYNTAX_HIGHLIGHT_CACHE_ENTRIES)
+
+@functools.lru_cache(maxsize=1)
+def get_syntax_highlight_mode():
+    # Pygments is optional: without it pages keep highlighting in the browser.
+    if SYNTAX_HIGHLIGHT_MODE != 'server':
+        return 'client'
+    try:
+        import pygments  # noqa: F401
+    except ImportError:
+        logger.warning("SYNTAX_HIGHLIGHT_MODE=server needs Pygments, falling back to client-side highlighting")
+        return 'client'
+    return 'server'
+
+@functools.lru_cache(maxsize=1)
+def _get_formatter():
+    from pygments.formatters import HtmlFormatter
+    return HtmlFormatter(style=SYNTAX_HIGHLIGHT_STYLE, nowrap=True)
+
+@functools.lru_cache(maxsize=128)
+def _get_lexer(language):
+    from pygments.lexers import get_lexer_by_name
+    from pygments.util import ClassNotFound
+    try:
+        return get_lexer_by_name(language, stripnl=False, ensurenl=False)
+    except ClassNotFound:
+        return None
+
+def highlight_code(code, language):
+    # Returns the highlighted inner HTML of a code block, or None when the
+    # language is unknown and the block should be left as it is.
+    lexer = _get_lexer(language.lower())
+    if lexer is None:
+        return None
+
+    key = highlight_cache.make_key(code, language.lower(), SYNTAX_HIGHLIGHT_STYLE)
+    highlighted = highlight_cache.get(key)
+    if highlighted is None:
+        from pygments import highlight
+        highlighted = highlight(code, lexer, _get_formatter())
+        highlight_cache.set(key, highlighted)
+    return highlighted
+
+@functools.lru_cache(maxsize=1)
+def get_highlight_css():
+    formatter = _get_formatter()
+    selector = f'.{HIGHLIGHT_CLASS}'
+    return '\n'.join([
+        *formatter.get_background_style_defs(selector),
+        *formatter.get_token_style_defs(selector),
+    ]) + '\n'
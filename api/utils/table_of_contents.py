@@ -1,42 +1,75 @@
 import re
+import html
 
-def generate_table_of_contents(html_content):
-    heading_pattern = r'<h([1-6])(?:\s+id="([^"]*)")?[^>]*>(.*?)</h[1-6]>'
-    headings = re.findall(heading_pattern, html_content, re.DOTALL)
-    
+def slugify_heading(text):
+    heading_id = re.sub(r'[^\w\s-]', '', text.lower())
+    return re.sub(r'[-\s]+', '-', heading_id).strip('-')
+
+def render_table_of_contents(headings):
     if not headings:
         return ""
-    
+
     toc_html = '<div class="table-of-contents">\n'
     toc_html += '<h3>Table of Contents</h3>\n<ul>\n'
-    
-    for level, heading_id, text in headings:
-        level = int(level)
-        clean_text = re.sub(r'<[^>]+>', '', text).strip()
-        
-        if not heading_id:
-            heading_id = re.sub(r'[^\w\s-]', '', clean_text.lower())
-            heading_id = re.sub(r'[-\s]+', '-', heading_id).strip('-')
-        
-        toc_html += f'<li class="toc-level-{level}"><a href="#{heading_id}">{clean_text}</a></li>\n'
-    
+
+    for heading in headings:
+        toc_html += f'<li class="toc-level-{heading["level"]}"><a href="#{heading["id"]}">{html.escape(heading["text"], quote=False)}</a></li>\n'
+
     toc_html += '</ul>\n</div>\n'
     return toc_html
 
+def generate_table_of_contents(html_content):
+    heading_pattern = r'<h([1-6])(?:\s+id="([^"]*)")?[^>]*>(.*?)</h[1-6]>'
+    headings = []
+
+    for level, heading_id, text in re.findall(heading_pattern, html_content, re.DOTALL):
+        clean_text = html.unescape(re.sub(r'<[^>]+>', '', text).strip())
+        headings.append({'level': int(level), 'id': heading_id or slugify_heading(clean_text), 'text': clean_text})
+
+    return render_table_of_contents(headings)
+
+HEADING_OPEN_RE = re.compile(r'<h([1-6])\b[^>]*?\sid="([^"]*)"')
+
+def index_headings(html_content, headings):
+    # Pins the headings collected during rendering to their byte offset in
+    # the final HTML. Only opening tags are scanned; level, id and text come
+    # from the render. Headings are matched in document order, so repeated
+    # ids (in separately rendered tab panels) pair up correctly.
+    pending = {}
+    for heading in headings:
+        pending.setdefault((heading['level'], heading['id']), []).append(heading['text'])
+    for texts in pending.values():
+        texts.reverse()
+
+    index = []
+    offset = 0
+    position = 0
+    for match in HEADING_OPEN_RE.finditer(html_content):
+        texts = pending.get((int(match.group(1)), html.unescape(match.group(2))))
+        if not texts:
+            continue
+        offset += len(html_content[position:match.start()].encode('utf-8'))
+        position = match.start()
+        index.append({
+            'level': int(match.group(1)),
+            'id': html.unescape(match.group(2)),
+            'text': texts.pop(),
+            'offset': offset,
+        })
+    return index
+
 def add_ids_to_headings(html_content):
     def add_id(match):
         tag = match.group(1)
         level = match.group(2)
         attrs = match.group(3) or ""
         text = match.group(4)
-        
+
         if 'id=' not in attrs:
             clean_text = re.sub(r'<[^>]+>', '', text).strip()
-            heading_id = re.sub(r'[^\w\s-]', '', clean_text.lower())
-            heading_id = re.sub(r'[-\s]+', '-', heading_id).strip('-')
-            attrs += f' id="{heading_id}"'
-        
+            attrs += f' id="{slugify_heading(clean_text)}"'
+
         return f'<{tag}{level}{attrs}>{text}</{tag}{level}>'
-    
+
     pattern = r'<(h)([1-6])([^>]*)>(.*?)</h[1-6]>'
-    return re.sub(pattern, add_id, html_content, flags=re.DOTALL)
\ No newline at end of file
+    return re.sub(pattern, add_id, html_content, flags=re.DOTALL)
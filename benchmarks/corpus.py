@@ -0,0 +1,133 @@
+import os
+import random
+
+WORDS = (
+    'node scene player entity render shader client server packet event script module vector camera '
+    'physics body input action frame buffer texture light world block chunk signal value state '
+    'update process ready handler config option engine runtime asset mesh material animation'
+).split()
+
+LANGUAGES = ('typescript', 'js', 'java', 'lua')
+
+SCENARIOS = ('prose', 'code', 'tabs', 'embeds', 'xrefs', 'mixed')
+
+
+def _sentence(rng, words=12):
+    text = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(words // 2, words)))
+    return text[0].upper() + text[1:] + '.'
+
+
+def _paragraph(rng):
+    sentences = []
+    for _ in range(rng.randint(2, 5)):
+        sentence = _sentence(rng)
+        roll = rng.random()
+        if roll < 0.2:
+            sentence = sentence.replace(' ', ' **', 1).replace('.', '**.', 1)
+        elif roll < 0.4:
+            word = rng.choice(WORDS)
+            sentence += f' See `{word}()` for details.'
+        elif roll < 0.5:
+            sentence += f' [{rng.choice(WORDS)}](https://example.com/{rng.choice(WORDS)})'
+        sentences.append(sentence)
+    return ' '.join(sentences)
+
+
+def _code(rng, language=None, lines=None):
+    language = language or rng.choice(LANGUAGES)
+    body = []
+    for index in range(lines or rng.randint(4, 20)):
+        a, b = rng.choice(WORDS), rng.choice(WORDS)
+        if language == 'lua':
+            body.append(f'local {a}{index} = {b}("{rng.choice(WORDS)}", {index})')
+        elif language == 'java':
+            body.append(f'    var {a}{index} = {b}.get("{rng.choice(WORDS)}", {index});')
+        else:
+            body.append(f'  const {a}{index} = {b}.call("{rng.choice(WORDS)}", {index}); // {rng.choice(WORDS)}')
+    return f'```{language}\n' + '\n'.join(body) + '\n```'
+
+
+def _table(rng):
+    columns = rng.randint(3, 5)
+    rows = ['| ' + ' | '.join(rng.choice(WORDS).title() for _ in range(columns)) + ' |',
+            '|' + '---|' * columns]
+    for _ in range(rng.randint(3, 10)):
+        rows.append('| ' + ' | '.join(f'`{rng.choice(WORDS)}`' for _ in range(columns)) + ' |')
+    return '\n'.join(rows)
+
+
+def _tabs(rng):
+    panels = []
+    for language in rng.sample(LANGUAGES, rng.randint(2, 3)):
+        panels.append(f'--- tab: {language.title()}\n{_code(rng, language)}')
+    return '````tabs\n' + '\n'.join(panels) + '\n````'
+
+
+def _hint(rng):
+    kind = rng.choice(('info', 'warning', 'tip', 'note'))
+    return f'```hint {kind} {rng.choice(WORDS).title()}\n{_paragraph(rng)}\n```'
+
+
+def _glsl(rng):
+    return (
+        '```glsl\n'
+        'precision mediump float;\nuniform float u_time;\nuniform vec2 u_resolution;\n\n'
+        'void main() {\n'
+        '    vec2 st = gl_FragCoord.xy / u_resolution.xy;\n'
+        f'    gl_FragColor = vec4(st, {rng.random():.3f} + 0.5 * sin(u_time), 1.0);\n'
+        '}\n```'
+    )
+
+
+def _mermaid(rng):
+    nodes = rng.sample(WORDS, 5)
+    edges = '\n'.join(f'    {a}[{a.title()}] --> {b}[{b.title()}]' for a, b in zip(nodes, nodes[1:]))
+    return f'```mermaid\nflowchart TD\n{edges}\n```'
+
+
+def _xrefs(rng, titles):
+    refs = ' '.join(f'[[{rng.choice(titles)}]]' for _ in range(rng.randint(5, 15)))
+    return f'{_sentence(rng)} Related: {refs} and [[Missing {rng.choice(WORDS).title()}]].'
+
+
+def _section_blocks(scenario, rng, titles):
+    if scenario == 'prose':
+        return [_paragraph(rng) for _ in range(rng.randint(2, 4))] + ([_table(rng)] if rng.random() < 0.3 else [])
+    if scenario == 'code':
+        return [_paragraph(rng), _code(rng), _code(rng)]
+    if scenario == 'tabs':
+        return [_paragraph(rng), _tabs(rng), _hint(rng)]
+    if scenario == 'embeds':
+        return [_paragraph(rng), rng.choice((_glsl, _mermaid))(rng)]
+    if scenario == 'xrefs':
+        return [_xrefs(rng, titles) for _ in range(rng.randint(2, 4))]
+    return _section_blocks(rng.choice(SCENARIOS[:-1]), rng, titles)
+
+
+def generate_document(scenario, title, rng, titles, sections=6):
+    parts = [f'# {title}', _paragraph(rng)]
+    for index in range(sections):
+        parts.append(f'## {rng.choice(WORDS).title()} {index + 1}')
+        parts.extend(_section_blocks(scenario, rng, titles))
+    return '\n\n'.join(parts) + '\n'
+
+
+def generate_corpus(root, documents=20, scenarios=SCENARIOS, sections=6, seed=0):
+    # One folder per scenario ("1_Prose/3_Prose_Doc_3.md", ...), so a single
+    # tree exercises every feature mix and the navigation over all of them.
+    rng = random.Random(seed)
+    layout = []
+    for section_index, scenario in enumerate(scenarios, 1):
+        folder = f'{section_index}_{scenario.title()}'
+        for doc_index in range(1, documents + 1):
+            title = f'{scenario.title()} Doc {doc_index}'
+            layout.append((scenario, folder, f'{doc_index}_{title.replace(" ", "_")}', title))
+
+    titles = [title for _, _, _, title in layout]
+    paths = {}
+    for scenario, folder, name, title in layout:
+        os.makedirs(os.path.join(root, folder), exist_ok=True)
+        with open(os.path.join(root, folder, f'{name}.md'), 'w', encoding='utf-8') as f:
+            f.write(generate_document(scenario, title, rng, titles, sections))
+        paths.setdefault(scenario, []).append(f'{folder}/{name}')
+    return paths
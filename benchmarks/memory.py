@@ -0,0 +1,130 @@
+import argparse
+import gc
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from api.utils.documents import (
+    DocumentColumns, _build_document, extract_clean_title, extract_section_from_path,
+    get_order_from_filename, get_section_order_from_path,
+)
+
+FORMS = ('dicts', 'records', 'columns')
+
+
+def synthetic_inputs(count, sections=20, folder_size=25):
+    # (parent path, file stem, title) for count documents: numbered
+    # sections, each split into folders, one in ten without a "# " title.
+    inputs = []
+    for i in range(count):
+        section = i % sections
+        folder = (i // sections) // folder_size
+        parent = f"{section + 1}_Section_{section + 1}/{folder + 1}_Folder_{folder + 1}"
+        stem = f"{i % folder_size + 1}_Document_{i}"
+        inputs.append((parent, stem, None if i % 10 == 0 else f"Document {i}"))
+    return inputs
+
+
+def build_dicts(inputs):
+    # The dict each document used to be stored as.
+    documents = []
+    for parent, filename, title in inputs:
+        section = extract_section_from_path(parent) if parent else "Documentation"
+        documents.append({
+            'filename': f"{parent}/{filename}" if parent else filename,
+            'title': title or extract_clean_title(filename),
+            'section': section,
+            'category': section,
+            'is_subdoc': bool(parent),
+            'parent': parent if parent else None,
+            'recently_updated': False,
+            'order': get_order_from_filename(filename),
+            'section_order': get_section_order_from_path(parent) if parent else 999,
+        })
+    return documents
+
+
+def build_records(inputs):
+    return [_build_document(filename, parent, title) for parent, filename, title in inputs]
+
+
+def build_columns(inputs):
+    return DocumentColumns(build_records(inputs))
+
+
+def measure(form, inputs):
+    builder = {'dicts': build_dicts, 'records': build_records, 'columns': build_columns}[form]
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        documents = builder(inputs)
+        build_ms = (time.perf_counter() - start) * 1000
+        gc.collect()
+        retained = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+
+    # The two bulk operations the navigation runs on every new generation.
+    start = time.perf_counter()
+    if form == 'columns':
+        documents.order_by('section_order', 'section', 'order', 'title')
+        documents.where('recently_updated')
+    elif form == 'records':
+        sorted(documents, key=lambda x: (x.section_order, x.section, x.order, x.title))
+        [doc for doc in documents if doc.recently_updated]
+    else:
+        sorted(documents, key=lambda x: (x['section_order'], x['section'], x['order'], x['title']))
+        [doc for doc in documents if doc.get('recently_updated')]
+    bulk_ms = (time.perf_counter() - start) * 1000
+
+    return {
+        'documents': len(inputs),
+        'form': form,
+        'retained_bytes': retained,
+        'bytes_per_document': round(retained / len(inputs), 1),
+        # tracemalloc slows allocation down, so this is only comparable
+        # between forms.
+        'build_ms': round(build_ms, 1),
+        'sort_filter_ms': round(bulk_ms, 1),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m benchmarks.memory',
+        description='Compare the memory held by document metadata as dicts, records and columns.',
+    )
+    parser.add_argument('--sizes', default='10000,100000', help='comma-separated document counts (default: 10000,100000)')
+    parser.add_argument('--forms', default=','.join(FORMS), help=f"comma-separated subset of: {', '.join(FORMS)}")
+    parser.add_argument('--json', action='store_true', help='print the JSON report instead of a table')
+    args = parser.parse_args(argv)
+
+    forms = [name for name in args.forms.split(',') if name]
+    unknown = set(forms) - set(FORMS)
+    if unknown:
+        parser.error(f"unknown form: {', '.join(sorted(unknown))}")
+    sizes = [int(size) for size in args.sizes.split(',') if size]
+
+    results = []
+    for size in sizes:
+        inputs = synthetic_inputs(size)
+        for form in forms:
+            results.append(measure(form, inputs))
+
+    if args.json:
+        print(json.dumps({'meta': {'python': platform.python_version()}, 'results': results}, indent=2))
+    else:
+        print(f"{'documents':>9} {'form':<8} {'retained':>12} {'B/doc':>8} {'build ms':>9} {'sort+filter ms':>15}")
+        for row in results:
+            print(
+                f"{row['documents']:>9} {row['form']:<8} {row['retained_bytes']:>12} {row['bytes_per_document']:>8.1f} "
+                f"{row['build_ms']:>9.1f} {row['sort_filter_ms']:>15.1f}"
+            )
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,181 @@
+import argparse
+import json
+import logging
+import math
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+from benchmarks.corpus import SCENARIOS, generate_corpus
+
+BENCHMARKS = ('convert', 'render_file', 'serve_cold', 'serve_warm', 'documents', 'manifest')
+
+
+def percentile(samples, quantile):
+    # Nearest rank, so every reported value is an actual sample.
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(quantile * len(ordered)) - 1)]
+
+
+def summarize(scenario, benchmark, samples):
+    total_ms = sum(samples)
+    return {
+        'scenario': scenario,
+        'benchmark': benchmark,
+        'samples': len(samples),
+        'throughput_per_s': round(len(samples) / (total_ms / 1000), 2) if total_ms else None,
+        'mean_ms': round(total_ms / len(samples), 3),
+        'p50_ms': round(percentile(samples, 0.50), 3),
+        'p95_ms': round(percentile(samples, 0.95), 3),
+        'p99_ms': round(percentile(samples, 0.99), 3),
+        'max_ms': round(max(samples), 3),
+    }
+
+
+def _timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return (time.perf_counter() - start) * 1000, result
+
+
+def run_benchmarks(paths, docs_dir, iterations, benchmarks):
+    # Imported here: the api modules read DOCS_DIR and the cache settings
+    # from the environment at import time.
+    from api.app import app
+    from api.utils.block_cache import block_cache
+    from api.utils.documents import DocumentIndex, document_index
+    from api.utils.markdown import convert_markdown_to_html, render_markdown_file, _render_markdown_file_cached
+
+    for thread in threading.enumerate():
+        if thread.name == 'mdoc-init':
+            thread.join()
+
+    def clear_render_caches():
+        _render_markdown_file_cached.cache_clear()
+        block_cache.clear()
+
+    client = app.test_client()
+    results = []
+
+    def serve(name):
+        response = client.get(f'/{name}')
+        if response.status_code != 200:
+            raise RuntimeError(f"GET /{name} returned {response.status_code}")
+
+    for scenario, names in paths.items():
+        sources = {}
+        for name in names:
+            with open(os.path.join(docs_dir, *name.split('/')) + '.md', encoding='utf-8') as f:
+                sources[name] = f.read()
+
+        samples = {benchmark: [] for benchmark in benchmarks if benchmark not in ('documents', 'manifest')}
+        for benchmark in samples:
+            if benchmark == 'serve_warm':
+                for name in names:
+                    serve(name)
+            for _ in range(iterations):
+                for name in names:
+                    md_path = os.path.join(docs_dir, *name.split('/')) + '.md'
+                    if benchmark != 'serve_warm':
+                        clear_render_caches()
+                    if benchmark == 'convert':
+                        elapsed, _ = _timed(convert_markdown_to_html, sources[name], True)
+                    elif benchmark == 'render_file':
+                        elapsed, _ = _timed(render_markdown_file, md_path)
+                    else:
+                        elapsed, _ = _timed(serve, name)
+                    samples[benchmark].append(elapsed)
+
+        results.extend(summarize(scenario, benchmark, values) for benchmark, values in samples.items())
+
+    if 'documents' in benchmarks:
+        samples = []
+        for _ in range(iterations * 10):
+            samples.append(_timed(document_index.rescan)[0])
+        results.append(summarize('all', 'documents', samples))
+
+    if 'manifest' in benchmarks:
+        # A cold process: a fresh index that starts from the manifest.
+        document_index.rescan()
+        samples = []
+        for _ in range(iterations * 10):
+            index = DocumentIndex(document_index.root, manifest_path=document_index.manifest_path)
+            samples.append(_timed(index.documents)[0])
+        results.append(summarize('all', 'manifest', samples))
+
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m benchmarks.run',
+        description='Render a synthetic documentation tree and report per-scenario latency percentiles.',
+    )
+    parser.add_argument('--documents', type=int, default=20, help='documents per scenario (default: 20)')
+    parser.add_argument('--sections', type=int, default=6, help='h2 sections per document (default: 6)')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help=f"comma-separated subset of: {', '.join(SCENARIOS)}")
+    parser.add_argument('--benchmarks', default=','.join(BENCHMARKS), help=f"comma-separated subset of: {', '.join(BENCHMARKS)}")
+    parser.add_argument('--iterations', type=int, default=3, help='passes over each scenario (default: 3)')
+    parser.add_argument('--seed', type=int, default=0, help='corpus generator seed (default: 0)')
+    parser.add_argument('--corpus-dir', default=None, help='write the corpus here instead of a temporary directory')
+    parser.add_argument('--output', default=None, help='write the JSON report to this file')
+    parser.add_argument('--json', action='store_true', help='print the JSON report instead of a table')
+    args = parser.parse_args(argv)
+
+    scenarios = [name for name in args.scenarios.split(',') if name]
+    benchmarks = [name for name in args.benchmarks.split(',') if name]
+    unknown = (set(scenarios) - set(SCENARIOS)) | (set(benchmarks) - set(BENCHMARKS))
+    if unknown:
+        parser.error(f"unknown scenario or benchmark: {', '.join(sorted(unknown))}")
+
+    logging.basicConfig(level=logging.WARNING)
+
+    with tempfile.TemporaryDirectory(prefix='mdoc-bench-') as scratch:
+        docs_dir = args.corpus_dir or os.path.join(scratch, 'docs')
+        paths = generate_corpus(docs_dir, args.documents, scenarios, args.sections, args.seed)
+
+        # Measure rendering, not the on-disk cache, and keep the analytics
+        # database out of the real data directory.
+        os.environ['DOCS_DIR'] = docs_dir
+        os.environ['RENDER_CACHE_ENABLED'] = '0'
+        os.environ.setdefault('DB_TYPE', 'sqlite')
+        os.environ['DB_PATH'] = os.path.join(scratch, 'analytics.db')
+        os.environ['DOCS_MANIFEST_PATH'] = os.path.join(scratch, 'docs_manifest.json')
+
+        wall_start = time.perf_counter()
+        results = run_benchmarks(paths, docs_dir, args.iterations, benchmarks)
+        wall_s = time.perf_counter() - wall_start
+
+    report = {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'documents_per_scenario': args.documents,
+            'sections': args.sections,
+            'iterations': args.iterations,
+            'seed': args.seed,
+            'wall_s': round(wall_s, 2),
+        },
+        'results': results,
+    }
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"{'scenario':<8} {'benchmark':<12} {'n':>5} {'ops/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+        for row in results:
+            print(
+                f"{row['scenario']:<8} {row['benchmark']:<12} {row['samples']:>5} {row['throughput_per_s'] or 0:>9.1f} "
+                f"{row['p50_ms']:>9.2f} {row['p95_ms']:>9.2f} {row['p99_ms']:>9.2f}"
+            )
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,67 @@
+import argparse
+import logging
+import sys
+from api.utils.embed_payloads import prepare_payload
+
+# (kind, payload, expected compacted payload or None for an error)
+PAYLOAD_CASES = {
+    'glsl-plain': (
+        'glsl',
+        'void main() {\n    // red\n    gl_FragColor = vec4(1.0, 0.0, 0.0, 1.0);\n}\n',
+        'void main(){gl_FragColor=vec4(1.0,0.0,0.0,1.0);}',
+    ),
+    'glsl-operators': ('glsl', 'float a = b - -c;\nfloat d = e / *p;', 'float a=b- -c;float d=e/ *p;'),
+    'glsl-directives': (
+        'glsl',
+        '#version 300 es\nprecision highp float;\n#ifdef GL_ES\nuniform float u;\n#endif\n',
+        '#version 300 es\nprecision highp float;\n#ifdef GL_ES\nuniform float u;\n#endif',
+    ),
+    'glsl-define-continuation': (
+        'glsl',
+        '#define MIX(a, b, t) \\\n    mix(a, \\\n        b, t)\nvoid main() { gl_FragColor = vec4(MIX(0.0, 1.0, 0.5)); }\n',
+        '#define MIX(a, b, t) \\\nmix(a, \\\nb, t)\nvoid main(){gl_FragColor=vec4(MIX(0.0,1.0,0.5));}',
+    ),
+    'glsl-ifdef-branches': (
+        'glsl',
+        '#ifdef GL_ES\nvoid main() {\n    gl_FragColor = vec4(1.0);\n#else\nvoid main() {\n    gl_FragColor = vec4(0.0);\n#endif\n}\n',
+        '#ifdef GL_ES\nvoid main(){gl_FragColor=vec4(1.0);\n#else\nvoid main(){gl_FragColor=vec4(0.0);\n#endif\n}',
+    ),
+    'glsl-unbalanced': ('glsl', 'void main() {\n    gl_FragColor = vec4(1.0;\n}', None),
+    'glsl-unterminated-comment': ('glsl', 'void main() {} /* open', None),
+    'json-object': ('json', '{\n  "a": [1, 2],\n  "b": "x"\n}', '{"a":[1,2],"b":"x"}'),
+    'json-nan': ('json', '{"a": NaN}', None),
+    'json-array': ('json', '[1, 2]', None),
+}
+
+
+def check(kind, payload, expected):
+    result, error = prepare_payload(kind, payload, compact=True, mode='strict')
+    if expected is None:
+        return (error is not None), f"expected an error, got {result!r}"
+    if error is not None:
+        return False, f"unexpected error: {error}"
+    return result == expected, f"expected {expected!r}, got {result!r}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m scripts.check_payloads',
+        description='Check embed payload validation and compaction against known inputs.',
+    )
+    parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.ERROR)
+
+    failures = 0
+    for name, (kind, payload, expected) in PAYLOAD_CASES.items():
+        ok, detail = check(kind, payload, expected)
+        if not ok:
+            failures += 1
+            print(f"FAILED  {name}: {detail}")
+
+    print(f"{len(PAYLOAD_CASES)} cases: {len(PAYLOAD_CASES) - failures} passed, {failures} failed")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+import argparse
+import logging
+import os
+import sys
+from html.parser import HTMLParser
+from api.config import DOCS_DIR
+from api.utils.markdown import _render_markdown
+
+# Hostile or unusual input the tree sanitizer has to treat exactly like
+# bleach.clean, on top of every document in DOCS_DIR.
+SANITIZER_CASES = {
+    'script-block': '<script>alert(1)</script>\n\nafter',
+    'script-inline': 'text <script>alert(1)</script> more',
+    'event-handler': '<div class="x" onclick="alert(1)">body</div>',
+    'img-onerror': '<img src="x.png" onerror="alert(1)" alt="a">',
+    'javascript-href': '[click](javascript:alert(1))',
+    'javascript-href-raw': '<a href="javascript:alert(1)">x</a>',
+    'obfuscated-href': '<a href="jav&#x09;ascript:alert(1)">x</a>',
+    'data-href': '[x](data:text/html;base64,PHNjcmlwdD4=)',
+    'iframe-javascript': '<iframe src="javascript:alert(1)"></iframe>',
+    'style-attribute': '<span style="color:red" class="ok">x</span>',
+    'unknown-tag': '<details><summary>s</summary>body</details>',
+    'md-in-html': '<details markdown="1">\n\n**bold**\n\n</details>',
+    'comment': '<!-- keep me -->\n\ntext',
+    'comment-abrupt': '<div>\n<!--><img src=x onerror=alert(1)>-->\n</div>',
+    'comment-abrupt-dash': '<div>\n<!---><img src=x onerror=alert(1)>-->\n</div>',
+    'comment-bang-close': '<div>\n<!-- a --!><img src=x onerror=alert(1)> -->\n</div>',
+    'entities': 'AT&T &copy; &bogus; &#169; <b>x</b>',
+    'quotes-in-code': '```js\nconst s = "a" + \'b\' & c < d;\n```',
+    'relative-and-fragment-links': '[a](/docs/x) [b](#frag) [c](mailto:a@b.c) [d](ftp://f)',
+    'external-link': '[x](https://example.com "Title")',
+    'svg': '<svg viewBox="0 0 1 1" onload="alert(1)"><path d="M0 0"/></svg>',
+    'form-controls': '<input type="range" min="0" max="1" onchange="x()"><button type="button" formaction="javascript:x">b</button>',
+    'glsl-embed': '```glsl\nvoid main() { gl_FragColor = vec4(1.0); }\n```',
+    'tabs': '````tabs\n--- tab: A\n<em onmouseover="x">a</em>\n--- tab: B\n```js\nlet x = "<b>";\n```\n````',
+    'hint': '```hint warning Careful <b>now</b>\nBody with <script>x</script>\n```',
+}
+
+
+class _Canonicalizer(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.tokens = []
+
+    def _text(self, data):
+        data = ' '.join(data.split())
+        if not data:
+            return
+        if self.tokens and self.tokens[-1][0] == 'text':
+            self.tokens[-1] = ('text', f"{self.tokens[-1][1]} {data}")
+        else:
+            self.tokens.append(('text', data))
+
+    def handle_starttag(self, tag, attrs):
+        self.tokens.append(('start', tag, tuple(sorted((k, v or '') for k, v in attrs))))
+
+    def handle_endtag(self, tag):
+        self.tokens.append(('end', tag))
+
+    def handle_data(self, data):
+        self._text(data)
+
+    def handle_comment(self, data):
+        self.tokens.append(('comment', data.strip()))
+
+
+def canonicalize(html_content):
+    parser = _Canonicalizer()
+    parser.feed(html_content)
+    parser.close()
+    return parser.tokens
+
+
+def compare(md_content):
+    tree_html = _render_markdown(md_content, drop_first_h1=True, sanitizer='tree')[0]
+    bleach_html = _render_markdown(md_content, drop_first_h1=True, sanitizer='bleach')[0]
+
+    if tree_html == bleach_html:
+        return 'identical', None
+
+    tree_tokens = canonicalize(tree_html)
+    bleach_tokens = canonicalize(bleach_html)
+    if tree_tokens == bleach_tokens:
+        return 'equivalent', None
+
+    for index, (tree_token, bleach_token) in enumerate(zip(tree_tokens, bleach_tokens)):
+        if tree_token != bleach_token:
+            return 'different', f"token {index}: tree={tree_token!r} bleach={bleach_token!r}"
+    return 'different', f"token count: tree={len(tree_tokens)} bleach={len(bleach_tokens)}"
+
+
+def iter_documents(docs_dir):
+    for current_dir, _, files in sorted(os.walk(docs_dir)):
+        for item in sorted(files):
+            if item.endswith('.md'):
+                path = os.path.join(current_dir, item)
+                with open(path, 'r', encoding='utf-8') as f:
+                    yield os.path.relpath(path, docs_dir), f.read()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m scripts.check_sanitizer',
+        description='Check that the tree sanitizer produces the same HTML as bleach.clean.',
+    )
+    parser.add_argument('--docs-dir', default=DOCS_DIR, help='documents to compare (default: DOCS_DIR)')
+    parser.add_argument('--cases-only', action='store_true', help='only run the built-in hostile input cases')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+
+    inputs = list(SANITIZER_CASES.items())
+    if not args.cases_only:
+        inputs += list(iter_documents(args.docs_dir))
+
+    failures = 0
+    counts = {'identical': 0, 'equivalent': 0, 'different': 0}
+    for name, md_content in inputs:
+        outcome, detail = compare(md_content)
+        counts[outcome] += 1
+        if outcome == 'different':
+            failures += 1
+            print(f"DIFFERENT  {name}: {detail}")
+
+    print(
+        f"{len(inputs)} inputs: {counts['identical']} identical, "
+        f"{counts['equivalent']} equivalent after normalisation, {counts['different']} different"
+    )
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())